@@ -0,0 +1,98 @@
+import json
+import zlib
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatSession, ChatMessage, ChatArchive
+
+
+def _message_to_dict(m):
+    return {
+        'id': m.id,
+        'sender': m.sender,
+        'message': m.message,
+        'file_url': m.file_url,
+        'is_read': m.is_read,
+        'created_at': m.created_at.isoformat(),
+    }
+
+
+def _decode(payload):
+    return json.loads(zlib.decompress(bytes(payload)).decode('utf-8'))
+
+
+def _encode(messages):
+    return zlib.compress(json.dumps(messages, ensure_ascii=False).encode('utf-8'))
+
+
+def load_archived_messages(session):
+    """
+    Returns the archived history of a session as a list of dicts ordered by id.
+    'created_at' is converted back to a datetime so callers can format it like a live ChatMessage.
+    """
+    archive = ChatArchive.objects.filter(session=session).first()
+    if not archive:
+        return []
+
+    messages = _decode(archive.payload)
+    for m in messages:
+        m['created_at'] = parse_datetime(m['created_at'])
+    return messages
+
+
+def archive_session(session):
+    """
+    Moves all live messages of a session into its ChatArchive row.
+    Messages archived on a previous run are kept and the new ones appended.
+    Returns the number of messages moved.
+    """
+    with transaction.atomic():
+        live = list(ChatMessage.objects.filter(session=session).order_by('id'))
+        if not live:
+            return 0
+
+        archive = ChatArchive.objects.select_for_update().filter(session=session).first()
+        history = _decode(archive.payload) if archive else []
+        history.extend(_message_to_dict(m) for m in live)
+
+        if archive:
+            archive.payload = _encode(history)
+            archive.message_count = len(history)
+            archive.save()
+        else:
+            ChatArchive.objects.create(session=session, payload=_encode(history), message_count=len(history))
+
+        ChatMessage.objects.filter(id__in=[m.id for m in live]).delete()
+    return len(live)
+
+
+def sessions_to_archive(days):
+    """Inactive sessions untouched for more than `days` days that still have live messages."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return ChatSession.objects.filter(
+        is_active=False,
+        updated_at__lt=cutoff,
+        messages__isnull=False,
+    ).distinct()
+
+
+def archive_inactive_sessions(days=30, limit=None):
+    """
+    Archives every eligible session (one transaction per session, so a long run never holds a table lock).
+    Returns (sessions_archived, messages_moved).
+    """
+    session_ids = sessions_to_archive(days).values_list('id', flat=True)
+    if limit:
+        session_ids = session_ids[:limit]
+
+    sessions_archived = 0
+    messages_moved = 0
+    for session in ChatSession.objects.filter(id__in=list(session_ids)).iterator():
+        moved = archive_session(session)
+        if moved:
+            sessions_archived += 1
+            messages_moved += moved
+    return sessions_archived, messages_moved
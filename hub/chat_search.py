@@ -0,0 +1,152 @@
+from django.core.paginator import Paginator
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import ChatSession, ChatMessage
+
+FTS_TABLE = 'hub_chatmessage_fts'
+PG_INDEX_NAME = 'chatmessage_message_fts'
+PG_CONFIG = 'simple'  # Mixed Arabic/English text, so no language-specific stemming
+
+# SQLite: external-content FTS5 table over hub_chatmessage.message, kept current by triggers
+# (bulk_create and queryset.delete() skip model signals, triggers don't).
+SQLITE_FTS_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"message, content='hub_chatmessage', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON hub_chatmessage BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, message) VALUES (new.id, new.message);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON hub_chatmessage BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF message ON hub_chatmessage BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO {FTS_TABLE}(rowid, message) VALUES (new.id, new.message);
+    END""",
+]
+
+SQLITE_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+
+def install_sqlite_fts(cursor):
+    """Creates (or repairs) the FTS5 table and its triggers, then rebuilds the index from hub_chatmessage."""
+    for statement in SQLITE_FTS_SQL:
+        cursor.execute(statement)
+    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_sqlite_fts(cursor):
+    for trigger in SQLITE_TRIGGERS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def sqlite_fts_ready(cursor):
+    # Django's SQLite migrations rebuild tables on AlterField, which silently drops triggers
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+        [FTS_TABLE] + SQLITE_TRIGGERS,
+    )
+    return cursor.fetchone()[0] == 1 + len(SQLITE_TRIGGERS)
+
+
+def repair_sqlite_fts(using='default', force=False):
+    """
+    Reinstalls and rebuilds the FTS5 index when its table or a trigger is missing (or always, with `force`).
+    Runs after every `migrate` (post_migrate in models.py) and from `manage.py rebuild_chat_search`, never
+    during a search. Returns True if the index was rebuilt.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        if not force and sqlite_fts_ready(cursor):
+            return False
+        install_sqlite_fts(cursor)
+    return True
+
+
+def _fts5_query(query):
+    # Quote every term so user input can't inject FTS5 syntax; terms are ANDed, the last one is a prefix
+    terms = ['"%s"' % t.replace('"', '""') for t in query.split()]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class _SQLiteFTSHits:
+    """
+    Lazy, Paginator-compatible list of ranked message ids: only COUNT(*) and the requested slice are queried.
+    Read-only; the index is kept installed by repair_sqlite_fts().
+    """
+
+    def __init__(self, query):
+        self.match = _fts5_query(query)
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [self.match])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s OFFSET %s",
+                [self.match, key.stop - key.start, key.start],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def _message_hits_postgres(query):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    # Same expression as the GIN index created in migration 0025, so the planner can use it
+    vector = SearchVector('message', config=PG_CONFIG)
+    search_query = SearchQuery(query, config=PG_CONFIG, search_type='websearch')
+    return (
+        ChatMessage.objects.annotate(search=vector)
+        .filter(search=search_query)
+        .annotate(rank=SearchRank(vector, search_query))
+        .order_by('-rank', '-id')
+        .values_list('id', flat=True)
+    )
+
+
+def _message_hits_fallback(query):
+    return ChatMessage.objects.filter(message__icontains=query).order_by('-id').values_list('id', flat=True)
+
+
+def search_chat_history(query, page=1, per_page=20):
+    """
+    Searches support chat history for admins.
+    Returns {'sessions': sessions whose guest name / email / username match,
+             'page': a Paginator page of ChatMessage hits ordered by relevance}.
+    Message text is matched through Postgres full-text search or SQLite FTS5; other backends fall back to icontains.
+    """
+    query = (query or '').strip()
+    if not query:
+        return {'sessions': [], 'page': Paginator([], per_page).get_page(1)}
+
+    sessions = ChatSession.objects.filter(
+        Q(guest_name__icontains=query) |
+        Q(guest_email__icontains=query) |
+        Q(user__username__icontains=query) |
+        Q(user__email__icontains=query)
+    ).select_related('user').order_by('-updated_at')[:per_page]
+
+    if connection.vendor == 'postgresql':
+        hit_ids = _message_hits_postgres(query)
+    elif connection.vendor == 'sqlite':
+        hit_ids = _SQLiteFTSHits(query)
+    else:
+        hit_ids = _message_hits_fallback(query)
+
+    # Paginate the ranked id list, then load only the current page's rows
+    page_obj = Paginator(hit_ids, per_page).get_page(page)
+    rows = ChatMessage.objects.select_related('session', 'session__user').in_bulk(list(page_obj.object_list))
+    page_obj.object_list = [rows[i] for i in page_obj.object_list if i in rows]
+
+    return {'sessions': list(sessions), 'page': page_obj}
@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+
+def notifications(request):
+    """
+    Exposes the cached notification summary used by the navbar dropdown in base.html.
+    Lazy, so pages that never render the dropdown don't touch the cache or database.
+    """
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return {}
+
+    from .notifications import get_notification_summary
+    return {'notification_summary': SimpleLazyObject(lambda: get_notification_summary(user))}
@@ -0,0 +1,93 @@
+"""
+Database cache of Drive folder listings, keyed by folder id, query scope and field mask.
+Entries are reused for DRIVE_CACHE_TTL seconds (0 disables the cache) and admins can expire them from
+the dashboard. Each row counts its hits and fetches so the dashboard can show the API calls saved.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import DriveListingCache
+
+
+def cache_ttl():
+    return getattr(settings, 'DRIVE_CACHE_TTL', 0)
+
+
+def get_listing(folder_id, scope, fields, stats=None):
+    """Returns the cached items for a folder listing if they are fresh, else None."""
+    ttl = cache_ttl()
+    if ttl <= 0:
+        return None
+    fresh = DriveListingCache.objects.filter(
+        folder_id=folder_id, scope=scope, fields=fields,
+        fetched_at__gte=timezone.now() - timedelta(seconds=ttl),
+    )
+    items = fresh.values_list('items', flat=True).first()
+    if items is None:
+        return None
+    fresh.update(hits=F('hits') + 1)
+    if stats is not None:
+        stats.record_hit(len(items))
+    return items
+
+
+def store_listing(folder_id, scope, fields, items, api_calls):
+    if cache_ttl() <= 0:
+        return
+    values = {'items': items, 'api_calls': api_calls, 'fetched_at': timezone.now()}
+    entry = DriveListingCache.objects.filter(folder_id=folder_id, scope=scope, fields=fields)
+    if entry.update(fetches=F('fetches') + 1, **values):
+        return
+    try:
+        with transaction.atomic():
+            DriveListingCache.objects.create(folder_id=folder_id, scope=scope, fields=fields, fetches=1, **values)
+    except IntegrityError:
+        # Another worker stored the same listing first
+        entry.update(fetches=F('fetches') + 1, **values)
+
+
+def cached_listing(folder_id, scope, fields, fetch, stats=None, refresh=False):
+    """
+    Returns a folder listing from the cache, or calls `fetch(stats)` and stores the result.
+    `refresh` skips the cached copy and replaces it.
+    """
+    from .drive_service import ListingStats
+
+    if not refresh:
+        items = get_listing(folder_id, scope, fields, stats)
+        if items is not None:
+            return items
+    fetch_stats = ListingStats()
+    items = fetch(fetch_stats)
+    if stats is not None:
+        stats.merge(fetch_stats)
+    store_listing(folder_id, scope, fields, items, fetch_stats.calls)
+    return items
+
+
+def expire_cache():
+    """
+    Manual refresh: marks every cached listing stale so the next import reads Drive again.
+    Hit and fetch counters are kept. Returns the number of entries expired.
+    """
+    ttl = cache_ttl()
+    return DriveListingCache.objects.update(fetched_at=timezone.now() - timedelta(seconds=ttl + 1))
+
+
+def cache_stats():
+    totals = DriveListingCache.objects.aggregate(
+        total_hits=Sum('hits'), total_fetches=Sum('fetches'), saved_calls=Sum(F('hits') * F('api_calls')),
+    )
+    hits, fetches = totals['total_hits'] or 0, totals['total_fetches'] or 0
+    return {
+        'entries': DriveListingCache.objects.count(),
+        'hits': hits,
+        'fetches': fetches,
+        'hit_rate': round(100 * hits / (hits + fetches)) if hits + fetches else 0,
+        'saved_calls': totals['saved_calls'] or 0,
+        'ttl_minutes': cache_ttl() // 60,
+    }
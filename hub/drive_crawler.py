@@ -0,0 +1,132 @@
+"""
+Walks a Drive folder tree with a bounded pool of concurrent `files().list` calls and maps a level's
+Term/Subject/Category layout onto Subject rows, using the folder-name tables of `import_resources`.
+"""
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from hub.management.commands.import_resources import CATEGORY_MAP, SUBJECT_MAP, TERM_MAP
+
+from . import drive_cache
+from .drive_service import FOLDER_MIME, SYNC_FIELDS, ListingStats, get_drive_service, iter_folder_children
+
+DEFAULT_WORKERS = 8
+
+
+class CrawlStats:
+    """Folder/file counts and wall time of one crawl; `listing` holds the per-call Drive latency."""
+
+    def __init__(self):
+        self.folders = 0
+        self.files = 0
+        self.seconds = 0.0
+        self.listing = ListingStats()
+
+    @property
+    def files_per_second(self):
+        return self.files / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.folders} folders, {self.files} files in {self.seconds:.2f}s "
+                f"({self.files_per_second:.1f} files/s; {self.listing})")
+
+
+def crawl(root_id, max_workers=DEFAULT_WORKERS, service=None, stats=None, use_cache=True, refresh=False):
+    """
+    Lists every file below `root_id`. Each folder is one task in a pool of `max_workers` threads,
+    and sub-folders are submitted as soon as their parent's listing returns.
+    Folder listings come from the Drive metadata cache when fresh (`refresh` re-reads and replaces
+    them); cache reads and writes happen on the calling thread only.
+    Returns (entries, stats) where entries are (path, file) pairs: `path` is the tuple of folder names
+    between the root and the file, and each file dict gains the 'folder_id' it was found in.
+    """
+    service = service or get_drive_service()
+    stats = stats or CrawlStats()
+    entries = []
+    listed = deque()
+    start = time.perf_counter()
+
+    def list_folder(folder_id):
+        folder_stats = ListingStats()
+        items = list(iter_folder_children(folder_id, fields=SYNC_FIELDS, service=service, stats=folder_stats))
+        stats.listing.merge(folder_stats)
+        return items, folder_stats.calls
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='drive-crawl') as pool:
+        pending = {}
+
+        def schedule(folder_id, path):
+            items = None
+            if use_cache and not refresh:
+                items = drive_cache.get_listing(folder_id, 'children', SYNC_FIELDS, stats=stats.listing)
+            if items is None:
+                pending[pool.submit(list_folder, folder_id)] = (folder_id, path)
+            else:
+                listed.append((folder_id, path, items))
+
+        schedule(root_id, ())
+        while pending or listed:
+            while listed:
+                folder_id, path, items = listed.popleft()
+                stats.folders += 1
+                for item in items:
+                    if item.get('mimeType') == FOLDER_MIME:
+                        schedule(item['id'], path + (item['name'],))
+                    else:
+                        file = {k: v for k, v in item.items() if k != 'mimeType'}
+                        entries.append((path, dict(file, folder_id=folder_id)))
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder_id, path = pending.pop(future)
+                    items, calls = future.result()
+                    if use_cache:
+                        drive_cache.store_listing(folder_id, 'children', SYNC_FIELDS, items, calls)
+                    listed.append((folder_id, path, items))
+
+    stats.files = len(entries)
+    stats.seconds = time.perf_counter() - start
+    return entries, stats
+
+
+def term_semester(name):
+    semester = TERM_MAP.get(name)
+    if semester:
+        return semester
+    # Term folders are named by hand ("Level 100 Secend Term"), so fall back to the ordinal
+    lower = name.lower()
+    if 'first' in lower:
+        return 1
+    if 'second' in lower or 'secend' in lower:
+        return 2
+    return None
+
+
+def map_level_files(level, entries):
+    """
+    Groups crawl entries from a level's root folder (Term/Subject/Category/...) by (subject, category).
+    Files in sub-folders of a category folder count for that category.
+    Returns (groups, unmatched): groups maps (Subject, category) to a list of files and unmatched
+    holds the (path, file) entries whose folders don't map to a subject and category.
+    """
+    subjects = {(s.semester, s.name.lower()): s for s in level.subjects.all()}
+    subject_map = SUBJECT_MAP.get(level.level_id, {})
+    groups = {}
+    unmatched = []
+
+    for path, f in entries:
+        if len(path) < 3:
+            unmatched.append((path, f))
+            continue
+        term_folder, subject_folder, category_folder = path[:3]
+        semester = term_semester(term_folder)
+        db_subject_name = subject_map.get(semester, {}).get(subject_folder.lower(), subject_folder)
+        subject = subjects.get((semester, db_subject_name.lower()))
+        category = CATEGORY_MAP.get(category_folder.lower())
+        if not subject or not category:
+            unmatched.append((path, f))
+            continue
+        groups.setdefault((subject, category), []).append(f)
+
+    return groups, unmatched
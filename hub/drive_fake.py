@@ -0,0 +1,96 @@
+"""
+An in-memory stand-in for the Drive v3 `files()` API, for tests and import benchmarks.
+It understands the queries drive_service builds ("'<id>' in parents", folder / non-folder mimeType,
+trashed = false), pages with nextPageToken and honours the `fields` mask.
+"""
+import itertools
+import re
+import threading
+import time
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+_counter = itertools.count(1)
+
+
+class FakeDrive:
+    """
+    Folder tree keyed by folder id. Build it with add_folder()/add_file(), then pass `drive.service()`
+    wherever a googleapiclient Drive service is expected. `latency` (seconds) is slept on every list call.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.children = {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add_folder(self, parent_id, name, folder_id=None):
+        folder_id = folder_id or f'folder{next(_counter)}'
+        self.children.setdefault(parent_id, []).append({'id': folder_id, 'name': name, 'mimeType': FOLDER_MIME})
+        self.children.setdefault(folder_id, [])
+        return folder_id
+
+    def add_file(self, parent_id, name, file_id=None, modified_time='2026-01-01T00:00:00.000Z', size='1024'):
+        file_id = file_id or f'file{next(_counter)}'
+        self.children.setdefault(parent_id, []).append({
+            'id': file_id, 'name': name, 'mimeType': 'application/pdf',
+            'modifiedTime': modified_time, 'size': size,
+        })
+        return file_id
+
+    def service(self):
+        return _FakeService(self)
+
+    def list(self, q='', pageSize=100, pageToken=None, fields=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls.append({'q': q, 'pageSize': pageSize, 'pageToken': pageToken, 'fields': fields})
+
+        parent = re.search(r"'([^']+)' in parents", q)
+        items = list(self.children.get(parent.group(1), [])) if parent else []
+        if f"mimeType != '{FOLDER_MIME}'" in q:
+            items = [i for i in items if i['mimeType'] != FOLDER_MIME]
+        elif f"mimeType = '{FOLDER_MIME}'" in q:
+            items = [i for i in items if i['mimeType'] == FOLDER_MIME]
+
+        start = int(pageToken or 0)
+        page = items[start:start + pageSize]
+        keys = _file_keys(fields)
+        response = {'files': [{k: v for k, v in item.items() if keys is None or k in keys} for item in page]}
+        if start + pageSize < len(items):
+            response['nextPageToken'] = str(start + pageSize)
+        return response
+
+
+def _file_keys(fields):
+    if not fields:
+        return None
+    match = re.search(r'files\(([^)]*)\)', fields)
+    return {k.strip() for k in match.group(1).split(',')} if match else None
+
+
+class _FakeRequest:
+    def __init__(self, drive, kwargs):
+        self.drive = drive
+        self.kwargs = kwargs
+
+    def execute(self, num_retries=0):
+        return self.drive.list(**self.kwargs)
+
+
+class _FakeFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, **kwargs):
+        return _FakeRequest(self.drive, kwargs)
+
+
+class _FakeService:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def files(self):
+        return _FakeFiles(self.drive)
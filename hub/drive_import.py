@@ -0,0 +1,254 @@
+import hashlib
+import json
+
+from django.db import transaction
+
+from .models import DriveSyncCheckpoint, Level, Subject, SubjectResource
+from .notifications import broadcast_notification
+from .resource_stats import defer_stats_refresh, schedule_refresh
+from .solution_matching import SolutionIndex, is_solution
+
+
+def _preview_url(file_id):
+    return f"https://drive.google.com/file/d/{file_id}/preview"
+
+
+def _download_url(file_id):
+    return f"https://drive.google.com/uc?id={file_id}&export=download"
+
+
+def folder_url_for(folder_id):
+    return f"https://drive.google.com/drive/folders/{folder_id}"
+
+
+def _clean_title(name):
+    return name.replace('.pdf', '').replace('.txt', '').strip()
+
+
+# Columns a sync may rewrite on an existing row (file_id is the key, never rewritten)
+SYNC_COLUMNS = ['title', 'preview_url', 'download_url', 'drive_folder_url', 'solution_url', 'solution_file_id']
+# Rows per INSERT/UPDATE statement (SQLite lowers this further to stay under its variable limit)
+BATCH_SIZE = 500
+
+
+def plan_category_files(files, folder_url):
+    """
+    Works out the rows a folder listing should produce, without touching the database: regular files
+    become resources and solution files are linked to the sheet they answer (see solution_matching)
+    or kept standalone. `files` are Drive dicts with id and name; a 'folder_id' key
+    overrides `folder_url` per file. Returns {file_id: {column: value}} over SYNC_COLUMNS.
+    """
+    def source_folder(f):
+        return folder_url_for(f['folder_id']) if f.get('folder_id') else folder_url
+
+    regular_files = [f for f in files if not is_solution(f['name'])]
+    solution_files = [f for f in files if is_solution(f['name'])]
+
+    planned = {}
+    index = SolutionIndex()
+
+    # 1. Regular Resources
+    for f in regular_files:
+        clean_title = _clean_title(f['name'])
+        row = {
+            'title': clean_title,
+            'preview_url': _preview_url(f['id']),
+            'download_url': _download_url(f['id']),
+            'drive_folder_url': source_folder(f),
+            'solution_url': None,
+            'solution_file_id': None,
+        }
+        planned[f['id']] = row
+        index.add(f['name'], row)
+
+    # 2. Solutions, linked to their parent where one exists ("Sheet 1 - Solution 2023" -> "Sheet 1")
+    for f in solution_files:
+        download = _download_url(f['id'])
+        parent, _ = index.match(f['name'])
+        if parent:
+            parent['solution_url'] = download
+            parent['solution_file_id'] = f['id']
+        else:
+            # Fallback: standalone resource if no parent found
+            clean_title = _clean_title(f['name'])
+            planned[f['id']] = {
+                'title': clean_title,
+                'preview_url': _preview_url(f['id']),
+                'download_url': download,
+                'drive_folder_url': source_folder(f),
+                'solution_url': download if 'solution' in clean_title.lower() else None,
+                'solution_file_id': None,
+            }
+
+    return planned
+
+
+def listing_fingerprint(files, folder_id):
+    """
+    (last_modified, fingerprint) of a listing. The fingerprint changes when a file is added, removed,
+    renamed, edited or moved between folders, so a matching checkpoint means there is nothing to write.
+    """
+    rows = sorted((f['id'], f['name'], f.get('modifiedTime', ''), f.get('folder_id', '')) for f in files)
+    digest = hashlib.sha256(json.dumps([folder_id, rows]).encode()).hexdigest()
+    return max((f.get('modifiedTime', '') for f in files), default=''), digest
+
+
+def sync_category_files(subject, category, planned, report=None):
+    """
+    Brings a subject's Drive resources in `category` in line with `planned` (see plan_category_files),
+    keyed on file_id: new files are inserted, changed rows updated and files gone from Drive deleted,
+    in bulk and in one transaction. Unchanged rows keep their primary key and aren't written.
+    Rows without a file_id (manual uploads) are left alone. `report()` is called once per planned row.
+    Returns {'added', 'updated', 'deleted', 'unchanged'}.
+    """
+    report = report or (lambda: None)
+    new, changed, removed = [], [], []
+    unchanged = 0
+
+    # No savepoint when sync_target already opened the transaction
+    with transaction.atomic(savepoint=False):
+        existing = {}
+        rows = SubjectResource.objects.filter(subject=subject, category=category, file_id__isnull=False)
+        for res in rows.only('id', 'file_id', *SYNC_COLUMNS).order_by('id'):
+            if res.file_id in existing:
+                # Left over from the old delete-and-recreate imports
+                removed.append(res.pk)
+            else:
+                existing[res.file_id] = res
+
+        for file_id, row in planned.items():
+            res = existing.pop(file_id, None)
+            if res is None:
+                new.append(SubjectResource(subject=subject, category=category, file_id=file_id, **row))
+            elif any(getattr(res, column) != value for column, value in row.items()):
+                for column, value in row.items():
+                    setattr(res, column, value)
+                changed.append(res)
+            else:
+                unchanged += 1
+            report()
+        removed.extend(res.pk for res in existing.values())
+
+        if removed:
+            SubjectResource.objects.filter(pk__in=removed).delete()
+        if changed:
+            SubjectResource.objects.bulk_update(changed, SYNC_COLUMNS, batch_size=BATCH_SIZE)
+        if new:
+            SubjectResource.objects.bulk_create(new, batch_size=BATCH_SIZE)
+
+    # Bulk writes send no signals; renames also need the cached subject page dropped
+    if new or changed or removed:
+        schedule_refresh(subject.id)
+    return {'added': len(new), 'updated': len(changed), 'deleted': len(removed), 'unchanged': unchanged}
+
+
+def sync_target(subject, category, files, folder_url, folder_id, report=None, force=False):
+    """
+    Syncs one subject/category from a listing unless its DriveSyncCheckpoint says the listing is the
+    one already imported (`force` skips that check). Returns the sync counts plus 'skipped'.
+    """
+    report = report or (lambda n=1: None)
+    planned = plan_category_files(files, folder_url)
+    last_modified, fingerprint = listing_fingerprint(files, folder_id)
+    if not force and DriveSyncCheckpoint.objects.filter(subject=subject, category=category, fingerprint=fingerprint).exists():
+        report(len(files))
+        return {'added': 0, 'updated': 0, 'deleted': 0, 'unchanged': len(planned), 'skipped': True}
+
+    with transaction.atomic():
+        counts = sync_category_files(subject, category, planned, report)
+        # One upsert rather than update_or_create's select + savepoint + write
+        DriveSyncCheckpoint.objects.bulk_create(
+            [DriveSyncCheckpoint(subject=subject, category=category, folder_id=folder_id,
+                                 last_modified=last_modified, fingerprint=fingerprint, file_count=len(files))],
+            update_conflicts=True,
+            unique_fields=['subject', 'category'],
+            update_fields=['folder_id', 'last_modified', 'fingerprint', 'file_count', 'synced_at'],
+        )
+    # Solutions linked onto a sheet share its row
+    report(len(files) - len(planned))
+    return dict(counts, skipped=False)
+
+
+def _counter(progress, total, message):
+    state = {'processed': 0}
+
+    def report(n=1):
+        state['processed'] += n
+        progress(state['processed'], total, message)
+    return report
+
+
+def import_drive_folder(folder_url, subject_id, category, progress=None, force=False):
+    """
+    Syncs a subject's resources in `category` with the files of a Drive folder (see sync_target).
+    An unchanged folder costs one list call and no writes.
+    `progress(processed, total, message)` is called as files are handled.
+    Returns the sync counts plus 'subject', 'category' and 'listing'.
+    """
+    from .drive_service import SYNC_FIELDS, ListingStats, extract_folder_id, list_files_in_folder
+
+    progress = progress or (lambda *args: None)
+    progress(0, 0, "Listing Drive folder")
+    listing = ListingStats()
+    files = list_files_in_folder(folder_url, fields=SYNC_FIELDS, stats=listing, refresh=force)
+    subject = Subject.objects.select_related('level').get(id=subject_id)
+
+    # One stats refresh for the subject at the end instead of one per saved/deleted row
+    with defer_stats_refresh():
+        result = sync_target(
+            subject, category, files, folder_url, extract_folder_id(folder_url),
+            _counter(progress, len(files), "Importing files"), force=force,
+        )
+
+    if result['added']:
+        # Notify Users similar to manual upload (one broadcast row for the whole level)
+        broadcast_notification(
+            title="New Resources Imported",
+            message=f"{result['added']} new {category} files have been added for {subject.name}.",
+            level=subject.level
+        )
+    return dict(result, subject=subject.name, category=category, listing=str(listing))
+
+
+def import_drive_level(root_url, level_id, progress=None, max_workers=8, force=False):
+    """
+    Crawls a level's root folder (Term/Subject/Category/files) and syncs the resources of every
+    subject and category found in it, in one job. Folders that don't map to a subject or category
+    are reported, not imported. Returns a summary dict.
+    """
+    from .drive_crawler import crawl, map_level_files
+    from .drive_service import extract_folder_id
+
+    progress = progress or (lambda *args: None)
+    root_id = extract_folder_id(root_url or '')
+    if not root_id:
+        raise ValueError("Invalid Google Drive Folder URL")
+    level = Level.objects.get(id=level_id)
+
+    progress(0, 0, "Crawling Drive folders")
+    entries, crawl_stats = crawl(root_id, max_workers=max_workers, refresh=force)
+    groups, unmatched = map_level_files(level, entries)
+
+    total = sum(len(files) for files in groups.values())
+    report = _counter(progress, total, "Importing files")
+    totals = {'added': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0, 'skipped': 0}
+    with defer_stats_refresh():
+        for (subject, category), files in groups.items():
+            result = sync_target(subject, category, files, root_url, root_id, report, force=force)
+            for key in totals:
+                totals[key] += result[key]
+    added = totals['added']
+
+    if added:
+        broadcast_notification(
+            title="New Resources Imported",
+            message=f"{added} new files have been added across {len(groups)} {level.title} folders.",
+            level=level
+        )
+    return dict(
+        totals,
+        folders=len(groups),
+        unmatched=len(unmatched),
+        unmatched_paths=sorted({'/'.join(path) for path, _ in unmatched})[:50],
+        crawl=str(crawl_stats),
+    )
@@ -1,13 +1,38 @@
+import logging
 import os
 import re
+import threading
+import time
+
+import google_auth_httplib2
+import httplib2
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
 
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 SERVICE_ACCOUNT_FILE = 'credentials.json'
 
-def get_drive_service():
-    """Authenticates and returns the Drive API service."""
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+# Drive caps pageSize at 1000 for files.list
+DEFAULT_PAGE_SIZE = 1000
+# Only what the importer reads; smaller responses list faster
+FILE_FIELDS = 'id, name'
+# Incremental sync also compares modifiedTime against the stored checkpoint
+SYNC_FIELDS = 'id, name, modifiedTime'
+
+logger = logging.getLogger(__name__)
+
+# Process-wide client cache. Credentials are parsed and the service object is built once per process;
+# every request gets its own httplib2.Http (which is not thread-safe) from _build_request, so the
+# service can be shared by the import worker threads.
+_client_lock = threading.Lock()
+_credentials = None
+_service = None
+CLIENT_STATS = {'builds': 0, 'reuses': 0, 'build_seconds': 0.0, 'token_refreshes': 0}
+
+
+def _load_credentials():
     creds = None
     
     # Check for environment variable (for railway)
@@ -28,9 +53,55 @@ def get_drive_service():
     if not creds:
         raise FileNotFoundError(
             f"Credentials not found. Please set GOOGLE_CREDENTIALS_JSON env var or ensure '{SERVICE_ACCOUNT_FILE}' exists.")
+    return creds
 
-    service = build('drive', 'v3', credentials=creds)
-    return service
+
+def _fresh_credentials():
+    # `valid` turns False a few minutes before the token expires (google-auth's refresh threshold),
+    # so the token is refreshed once, near expiry, instead of by every thread that notices it
+    if not _credentials.valid:
+        with _client_lock:
+            if not _credentials.valid:
+                _credentials.refresh(google_auth_httplib2.Request(httplib2.Http()))
+                CLIENT_STATS['token_refreshes'] += 1
+    return _credentials
+
+
+def _build_request(http, *args, **kwargs):
+    authed_http = google_auth_httplib2.AuthorizedHttp(_fresh_credentials(), http=httplib2.Http())
+    return HttpRequest(authed_http, *args, **kwargs)
+
+
+def get_drive_service():
+    """
+    Returns the process-wide Drive API service, building it on first use from the discovery
+    document bundled with googleapiclient (no discovery fetch).
+    """
+    global _credentials, _service
+    if _service is not None:
+        CLIENT_STATS['reuses'] += 1
+        return _service
+
+    with _client_lock:
+        if _service is None:
+            start = time.perf_counter()
+            _credentials = _load_credentials()
+            _service = build('drive', 'v3', credentials=_credentials, static_discovery=True,
+                             cache_discovery=False, requestBuilder=_build_request)
+            elapsed = time.perf_counter() - start
+            CLIENT_STATS['builds'] += 1
+            CLIENT_STATS['build_seconds'] += elapsed
+            logger.info("Drive client built in %.0f ms", elapsed * 1000)
+        else:
+            CLIENT_STATS['reuses'] += 1
+    return _service
+
+
+def reset_drive_service():
+    """Drops the cached client, e.g. after rotating GOOGLE_CREDENTIALS_JSON."""
+    global _credentials, _service
+    with _client_lock:
+        _credentials = _service = None
 
 def extract_folder_id(url):
     """Extracts Folder ID from a Drive URL."""
@@ -46,28 +117,104 @@ def extract_folder_id(url):
         return url
     return None
 
-def list_files_in_folder(folder_url):
+class ListingStats:
+    """Per-call timings of Drive list requests. Safe to share between crawler threads."""
+
+    def __init__(self):
+        self.latencies = []
+        self.files = 0
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, files):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.files += files
+
+    def record_hit(self, files):
+        with self._lock:
+            self.cache_hits += 1
+            self.files += files
+
+    def merge(self, other):
+        with self._lock:
+            self.latencies.extend(other.latencies)
+            self.files += other.files
+            self.cache_hits += other.cache_hits
+
+    @property
+    def calls(self):
+        return len(self.latencies)
+
+    @property
+    def total_seconds(self):
+        return sum(self.latencies)
+
+    def __str__(self):
+        cached = f", {self.cache_hits} cached" if self.cache_hits else ""
+        if not self.calls:
+            return f"0 calls{cached}"
+        return (f"{self.calls} calls, {self.files} files, "
+                f"avg {1000 * self.total_seconds / self.calls:.0f} ms, max {1000 * max(self.latencies):.0f} ms{cached}")
+
+
+def _iter_list(service, folder_id, query, page_size, fields, stats):
+    params = {'q': query, 'pageSize': page_size, 'fields': f"nextPageToken, files({fields})"}
+    while True:
+        start = time.perf_counter()
+        results = service.files().list(**params).execute()
+        elapsed = time.perf_counter() - start
+
+        files = results.get('files', [])
+        if stats is not None:
+            stats.record(elapsed, len(files))
+        logger.debug("Drive list %s: %d items in %.0f ms", folder_id, len(files), elapsed * 1000)
+
+        yield from files
+        params['pageToken'] = results.get('nextPageToken')
+        if not params['pageToken']:
+            break
+
+
+def iter_files_in_folder(folder_url, page_size=DEFAULT_PAGE_SIZE, fields=FILE_FIELDS, service=None, stats=None):
     """
-    Lists all non-folder files in a Google Drive folder.
-    Returns a list of dicts: {'id': '...', 'name': '...', 'size': '...'}
+    Yields the non-folder files of a Drive folder, one list page at a time, following nextPageToken.
+    Only `fields` are requested for each file (the importer needs id and name).
+    Pass a ListingStats as `stats` to collect per-call latency; `service` defaults to get_drive_service().
     """
     if not folder_url:
-        return []
+        return
 
     folder_id = extract_folder_id(folder_url)
     if not folder_id:
         raise ValueError("Invalid Google Drive Folder URL")
 
-    service = get_drive_service()
+    service = service or get_drive_service()
     
     # Query: inside parent folder ID and NOT a folder (mimeType != folder) and not trashed
-    query = f"'{folder_id}' in parents and mimeType != 'application/vnd.google-apps.folder' and trashed = false"
-    
-    results = service.files().list(
-        q=query,
-        pageSize=1000,
-        fields="nextPageToken, files(id, name, size, mimeType)"
-    ).execute()
-    
-    files = results.get('files', [])
-    return files
+    query = f"'{folder_id}' in parents and mimeType != '{FOLDER_MIME}' and trashed = false"
+    yield from _iter_list(service, folder_id, query, page_size, fields, stats)
+
+
+def iter_folder_children(folder_id, page_size=DEFAULT_PAGE_SIZE, fields=FILE_FIELDS, service=None, stats=None):
+    """Yields every non-trashed child (files and sub-folders) of a folder, with mimeType added to `fields`."""
+    service = service or get_drive_service()
+    query = f"'{folder_id}' in parents and trashed = false"
+    yield from _iter_list(service, folder_id, query, page_size, f"{fields}, mimeType", stats)
+
+
+def list_files_in_folder(folder_url, page_size=DEFAULT_PAGE_SIZE, fields=FILE_FIELDS, service=None, stats=None, refresh=False):
+    """
+    Lists all non-folder files in a Google Drive folder (every page, not just the first).
+    Returns a list of dicts: {'id': '...', 'name': '...'} plus any other requested `fields`.
+    The listing is served from the Drive metadata cache while fresh; `refresh` re-reads Drive.
+    """
+    from .drive_cache import cached_listing
+
+    folder_id = extract_folder_id(folder_url) if folder_url else None
+    if not folder_id:
+        return list(iter_files_in_folder(folder_url, page_size=page_size, fields=fields, service=service, stats=stats))
+
+    def fetch(fetch_stats):
+        return list(iter_files_in_folder(folder_id, page_size=page_size, fields=fields, service=service, stats=fetch_stats))
+    return cached_listing(folder_id, 'files', fields, fetch, stats=stats, refresh=refresh)
@@ -0,0 +1,140 @@
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# Progress writes are throttled so a 1000-file import doesn't do 1000 extra UPDATEs
+PROGRESS_EVERY = 10
+
+# A 'running' job older than this is assumed to belong to a dead worker
+STALE_AFTER = timedelta(hours=1)
+
+HANDLERS = {}
+
+
+def job_handler(kind):
+    """Registers `func(payload, progress)` as the handler for jobs of `kind`; its return value becomes job.result."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, payload, user=None):
+    if kind not in HANDLERS:
+        raise ValueError(f"No handler for job kind '{kind}'")
+    return ImportJob.objects.create(kind=kind, payload=payload, created_by=user)
+
+
+def claim_next_job(worker):
+    """
+    Atomically moves the oldest queued job to 'running' for `worker` and returns it, or None.
+    The claim is a conditional UPDATE, so two workers racing for the same row can't both win;
+    this works the same on SQLite and PostgreSQL without row locks.
+    """
+    while True:
+        job_id = ImportJob.objects.filter(status='queued').order_by('id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        claimed = ImportJob.objects.filter(id=job_id, status='queued').update(
+            status='running', worker=worker, started_at=timezone.now(),
+        )
+        if claimed:
+            return ImportJob.objects.get(id=job_id)
+
+
+def _progress_writer(job):
+    last = {'processed': -PROGRESS_EVERY}
+
+    def progress(processed, total, message=''):
+        if processed - last['processed'] < PROGRESS_EVERY and processed != total:
+            return
+        last['processed'] = processed
+        ImportJob.objects.filter(id=job.id).update(processed=processed, total=total, message=message[:255])
+    return progress
+
+
+def run_job(job):
+    """Executes a claimed job and records the outcome on its row. Never raises."""
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"No handler for job kind '{job.kind}'")
+        result = handler(job.payload, _progress_writer(job))
+    except Exception as e:
+        logger.exception("Job %s failed", job.pk)
+        ImportJob.objects.filter(id=job.id).update(
+            status='failed', error=f"{e}\n\n{traceback.format_exc()}"[:10000], finished_at=timezone.now(),
+        )
+        return False
+    ImportJob.objects.filter(id=job.id).update(
+        status='done', result=result or {}, message='Done', finished_at=timezone.now(),
+    )
+    return True
+
+
+def requeue_stale_jobs(older_than):
+    """Puts 'running' jobs whose worker died (started more than `older_than` ago) back in the queue."""
+    cutoff = timezone.now() - older_than
+    return ImportJob.objects.filter(status='running', started_at__lt=cutoff).update(status='queued', worker='')
+
+
+def work(worker, once=False, poll_interval=2.0, stop=None, sleep=None):
+    """
+    Worker loop: claims and runs jobs until `stop()` returns True. With `once`, exits when the queue is empty.
+    Returns the number of jobs executed.
+    """
+    sleep = sleep or time.sleep
+    executed = 0
+    while not (stop and stop()):
+        close_old_connections()
+        job = claim_next_job(worker)
+        if job is None:
+            if once:
+                break
+            sleep(poll_interval)
+            continue
+        run_job(job)
+        executed += 1
+    return executed
+
+
+def job_status(job):
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'processed': job.processed,
+        'total': job.total,
+        'message': job.message,
+        'result': job.result,
+        'error': job.error.splitlines()[0] if job.error else '',
+        'done': job.status in ('done', 'failed'),
+    }
+
+
+@job_handler('drive_folder_import')
+def _drive_folder_import(payload, progress):
+    from .drive_import import import_drive_folder
+    return import_drive_folder(payload['folder_url'], payload['subject_id'], payload['category'], progress=progress,
+                               force=payload.get('force', False))
+
+
+@job_handler('drive_level_import')
+def _drive_level_import(payload, progress):
+    from .drive_import import import_drive_level
+    return import_drive_level(payload['root_url'], payload['level_id'], progress=progress, force=payload.get('force', False))
+
+
+@job_handler('notification_fan_out')
+def _notification_fan_out(payload, progress):
+    from .notifications import FAN_OUT_AUDIENCES, fan_out
+    recipients = FAN_OUT_AUDIENCES[payload['audience']]()
+    return {'sent': fan_out(recipients, payload['title'], payload['message'], progress=progress)}
@@ -0,0 +1,62 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from hub.models import ChatSession, ChatMessage
+from hub.chat_archive import archive_inactive_sessions, sessions_to_archive
+
+
+class Command(BaseCommand):
+    help = 'Moves messages of support chats inactive for more than N days into compressed per-session archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Archive sessions inactive for more than this many days (default 30)')
+        parser.add_argument('--limit', type=int, default=None, help='Maximum number of sessions to archive in this run')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived')
+
+    def table_stats(self):
+        """Row count, on-disk size (Postgres only) and average latency of the polling query."""
+        rows = ChatMessage.objects.count()
+
+        size = None
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_total_relation_size(%s)", [ChatMessage._meta.db_table])
+                size = cursor.fetchone()[0]
+
+        # Same query get_messages runs on every poll, over a sample of live sessions
+        sample = list(ChatSession.objects.filter(is_active=True).values_list('id', flat=True)[:20])
+        start = time.perf_counter()
+        for session_id in sample:
+            list(ChatMessage.objects.filter(session_id=session_id, id__gt=0).order_by('created_at'))
+        latency_ms = (time.perf_counter() - start) * 1000 / len(sample) if sample else 0.0
+
+        return rows, size, latency_ms
+
+    def report(self, label, stats):
+        rows, size, latency_ms = stats
+        size_text = f", {size / 1024:.1f} KB on disk" if size is not None else ""
+        self.stdout.write(f'{label}: {rows} messages{size_text}, poll query {latency_ms:.2f} ms avg')
+
+    def handle(self, *args, **options):
+        days = options['days']
+
+        if options['dry_run']:
+            pending = sessions_to_archive(days)
+            count = pending.count()
+            messages = ChatMessage.objects.filter(session__in=pending).count()
+            self.stdout.write(f'{count} sessions ({messages} messages) inactive for more than {days} days would be archived.')
+            return
+
+        before = self.table_stats()
+        self.report('Before', before)
+
+        start = time.perf_counter()
+        sessions_archived, messages_moved = archive_inactive_sessions(days=days, limit=options['limit'])
+        elapsed = time.perf_counter() - start
+
+        after = self.table_stats()
+        self.report('After', after)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {messages_moved} messages from {sessions_archived} sessions in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hub import drive_service
+
+
+class Command(BaseCommand):
+    help = 'Measures Drive client startup: a cold build (credentials + bundled discovery) versus the cached client'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Cold builds and cached lookups to time')
+
+    def handle(self, *args, **options):
+        n = options['iterations']
+
+        # Fail with a command error rather than a traceback when there is nothing to build from
+        drive_service.reset_drive_service()
+        try:
+            drive_service.get_drive_service()
+        except FileNotFoundError as e:
+            raise CommandError(f'{e} The benchmark builds the real Drive client, so it needs credentials.')
+
+        cold = []
+        for _ in range(n):
+            drive_service.reset_drive_service()
+            start = time.perf_counter()
+            drive_service.get_drive_service()
+            cold.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(n):
+            drive_service.get_drive_service()
+        warm = (time.perf_counter() - start) / n
+
+        self.stdout.write(f'Cold build: avg {1000 * sum(cold) / n:.1f} ms, max {1000 * max(cold):.1f} ms over {n} runs')
+        self.stdout.write(f'Cached client: avg {1_000_000 * warm:.1f} µs')
+        self.stdout.write(self.style.SUCCESS(f'Done! Stats: {drive_service.CLIENT_STATS}'))
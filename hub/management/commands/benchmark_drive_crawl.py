@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from hub.drive_crawler import crawl
+from hub.drive_fake import FakeDrive
+
+
+class Command(BaseCommand):
+    help = 'Crawls a fake Level/Term/Subject/Category Drive tree and reports files/sec per worker count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16], help='Pool sizes to compare')
+        parser.add_argument('--latency', type=float, default=0.05, help='Seconds slept per fake list call')
+        parser.add_argument('--subjects', type=int, default=8, help='Subjects per term')
+        parser.add_argument('--files', type=int, default=12, help='Files per category folder')
+
+    def build_tree(self, options):
+        drive = FakeDrive(latency=options['latency'])
+        for term in ('First Term', 'Second Term'):
+            term_id = drive.add_folder('root', term)
+            for s in range(options['subjects']):
+                subject_id = drive.add_folder(term_id, f'Subject {s + 1}')
+                for category in ('Lectures', 'Sheets', 'Midterm', 'Final'):
+                    category_id = drive.add_folder(subject_id, category)
+                    for n in range(options['files']):
+                        drive.add_file(category_id, f'{category} {n + 1}.pdf')
+        return drive
+
+    def handle(self, *args, **options):
+        drive = self.build_tree(options)
+        baseline = None
+        for workers in options['workers']:
+            entries, stats = crawl('root', max_workers=workers, service=drive.service(), use_cache=False)
+            baseline = baseline or stats.files_per_second
+            speedup = stats.files_per_second / baseline if baseline else 0
+            self.stdout.write(f'{workers:>3} workers: {stats} -> {speedup:.1f}x')
+        self.stdout.write(self.style.SUCCESS('Done!'))
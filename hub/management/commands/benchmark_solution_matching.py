@@ -0,0 +1,153 @@
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from hub.solution_matching import SolutionIndex, is_solution
+
+# Labelled listings in the naming styles found in our Drive folders: "solution -> parent" lines
+# give the expected link, "solution -> -" means it should stay standalone.
+SAMPLE_FOLDERS = {
+    'sheets (english)': """
+        Sheet 1.pdf
+        Sheet 2.pdf
+        Sheet 3.pdf
+        Sheet 4 - Kinematics.pdf
+        Sheet 1 Solution.pdf -> Sheet 1.pdf
+        Sheet 2 - Solution 2023.pdf -> Sheet 2.pdf
+        Solution of sheet 3.pdf -> Sheet 3.pdf
+        Sheet_4_Solution.pdf -> Sheet 4 - Kinematics.pdf
+        Sheet 5 Solution.pdf -> -
+    """,
+    'sheets (arabic)': """
+        شيت 1.pdf
+        شيت 2.pdf
+        الشيت الثالث 3.pdf
+        حل شيت 1.pdf -> شيت 1.pdf
+        حل الشيت ٢.pdf -> شيت 2.pdf
+        الحل 3.pdf -> الشيت الثالث 3.pdf
+    """,
+    'exams': """
+        Midterm 2022.pdf
+        Midterm 2023.pdf
+        Final 2023.pdf
+        Quiz 1.pdf
+        Midterm 2023 Model Answer.pdf -> Midterm 2023.pdf
+        Final 2023 Solution.pdf -> Final 2023.pdf
+        Quiz 1 Answers.pdf -> Quiz 1.pdf
+        Final 2021 Solution.pdf -> -
+    """,
+    'lectures': """
+        Lecture 1 - Introduction.pdf
+        Lec 2 Statics.pdf
+        Modeling of Systems.pdf
+        محاضرة 3.pdf
+        Lecture 2 problems solution.pdf -> Lec 2 Statics.pdf
+        حل محاضرة 3.pdf -> محاضرة 3.pdf
+    """,
+    # Title words that look like solution abbreviations: each file is its own resource
+    'lookalikes': """
+        Lecture 3.pdf
+        Lecture 3 Key Concepts.pdf -> -
+        Lecture 2.pdf
+        Lecture 2 - Mathematical Model.pdf -> -
+        Midterm Model Exam.pdf -> -
+        نموذج امتحان 2023.pdf -> -
+        Sheet 4.pdf
+        Sheet 4 Key.pdf -> Sheet 4.pdf
+        Ans Sheet 5.pdf -> -
+    """,
+}
+
+
+def parse_listing(text):
+    """Returns (names, expected) where expected maps a solution name to its parent name or None."""
+    names, expected = [], {}
+    for line in text.strip().splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        name, _, parent = (part.strip() for part in line.partition('->'))
+        names.append(name)
+        if parent:
+            expected[name] = None if parent == '-' else parent
+    return names, expected
+
+
+def legacy_match(names):
+    """The chained replace() + exact title lookup the importer used before SolutionIndex."""
+    words = ('solution', 'answer', 'model', 'حل')
+    parents = {n.replace('.pdf', '').replace('.txt', '').strip().lower(): n
+               for n in names if not any(w in n.lower() for w in words)}
+    links = {}
+    for name in names:
+        if any(w in name.lower() for w in words):
+            search = name.lower().replace('.pdf', '').replace('.txt', '')
+            search = search.replace('solution', '').replace('answer', '').replace('model', '').replace('answers', '').replace('حل', '').strip()
+            links[name] = parents.get(re.sub(r'\s+', ' ', search).strip(" -_"))
+    return links
+
+
+def index_match(names):
+    index = SolutionIndex()
+    for name in names:
+        if not is_solution(name):
+            index.add(name, name)
+    return {name: index.match(name)[0] for name in names if is_solution(name)}
+
+
+class Command(BaseCommand):
+    help = 'Accuracy report and timing for solution-to-sheet matching, legacy lookup versus SolutionIndex'
+
+    def add_arguments(self, parser):
+        parser.add_argument('listings', nargs='*',
+                            help='Text files, one folder listing each (one file name per line, optional "-> parent")')
+        parser.add_argument('--folder', action='append', default=[], help='Drive folder URL to list and match (unlabelled)')
+        parser.add_argument('--size', type=int, default=5000, help='Sheets in the synthetic timing folder')
+
+    def load(self, options):
+        folders = {}
+        for path in options['listings']:
+            with open(path, encoding='utf-8') as f:
+                folders[path] = parse_listing(f.read())
+        if options['folder']:
+            from hub.drive_service import list_files_in_folder
+            for url in options['folder']:
+                folders[url] = ([f['name'] for f in list_files_in_folder(url)], {})
+        if not folders:
+            folders = {label: parse_listing(text) for label, text in SAMPLE_FOLDERS.items()}
+        return folders
+
+    def handle(self, *args, **options):
+        totals = {'legacy': [0, 0], 'index': [0, 0]}
+        for label, (names, expected) in self.load(options).items():
+            results = {'legacy': legacy_match(names), 'index': index_match(names)}
+            line = [f'{label}:']
+            for matcher, links in results.items():
+                linked = sum(1 for parent in links.values() if parent)
+                line.append(f'{matcher} linked {linked}/{len(links)}')
+                if expected:
+                    correct = sum(1 for name, parent in expected.items() if links.get(name) == parent)
+                    totals[matcher][0] += correct
+                    totals[matcher][1] += len(expected)
+                    line.append(f'({correct}/{len(expected)} correct)')
+                    for name, parent in expected.items():
+                        if matcher == 'index' and links.get(name) != parent:
+                            self.stdout.write(self.style.WARNING(f'  miss: {name} -> {links.get(name)} (expected {parent})'))
+            self.stdout.write(' '.join(line))
+
+        for matcher, (correct, labelled) in totals.items():
+            if labelled:
+                self.stdout.write(f'{matcher} accuracy: {correct}/{labelled} ({100 * correct / labelled:.0f}%)')
+
+        n = options['size']
+        # Sheet numbers repeat across groups, so (kind, number) lookups have several candidates to rank
+        titles = [f'Sheet {i % 100 + 1} Group {i // 100 + 1}' for i in range(n)]
+        names = [f'{t}.pdf' for t in titles] + [f'{t} - Solution 2023.pdf' for t in titles]
+        for matcher, fn in (('legacy', legacy_match), ('index', index_match)):
+            start = time.perf_counter()
+            links = fn(names)
+            elapsed = time.perf_counter() - start
+            linked = sum(1 for parent in links.values() if parent)
+            self.stdout.write(f'{matcher}: {2 * n} files in {1000 * elapsed:.0f} ms, linked {linked}/{n}')
+        self.stdout.write(self.style.SUCCESS('Done!'))
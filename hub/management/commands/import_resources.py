@@ -1,122 +1,135 @@
 import os
 from django.core.management.base import BaseCommand
 from hub.models import Level, Subject, SubjectResource
+from hub.resource_stats import defer_stats_refresh
 from django.conf import settings
 
-class Command(BaseCommand):
-    help = 'Import organized resources from media/resources/Level000'
+# Folder-name mappings, shared with the Drive crawler (hub/drive_crawler.py)
+LEVEL_MAP = {
+    "Level000": "000",
+    "Level100": "100",
+    "Level200": "200"
+}
 
-    def handle(self, *args, **options):
-        level_map = {
-            "Level000": "000",
-            "Level100": "100",
-            "Level200": "200"
-        }
-        
-        term_map = {
-            "Level 000 First Term": 1,
-            "Level 000 Second Term": 2,
-            "Level 100 First Term": 1,
-            "LEVEL 100 Secend Term": 2,
-            "Level 200 First Term": 1
+TERM_MAP = {
+    "Level 000 First Term": 1,
+    "Level 000 Second Term": 2,
+    "Level 100 First Term": 1,
+    "LEVEL 100 Secend Term": 2,
+    "Level 200 First Term": 1
+}
+
+# Subject mapping by Level (Level ID -> Semester -> Folder Name -> DB Name)
+SUBJECT_MAP = {
+    "000": {
+        1: {
+            "drawing and projection": "Drawing and Projection",
+            "english": "English",
+            "math 1": "Math 1",
+            "mechanice": "Mechanics",
+            "chemistry": "Chemistry",
+            "physics": "Physics",
+        },
+        2: {
+            "drawing and projection": "Drawing and Projection",
+            "math": "Math 2",
+            "mechanics": "Mechanics 2",
+            "physics": "Physics 2",
+            "production technology": "Production Technology",
+            "program": "Program",
+            "تاريخ هندسي": "Engineering History"
         }
-        
-        # Subject mapping by Level (Level ID -> Semester -> Folder Name -> DB Name)
-        subject_map = {
-            "000": {
-                1: {
-                    "drawing and projection": "Drawing and Projection",
-                    "english": "English",
-                    "math 1": "Math 1",
-                    "mechanice": "Mechanics",
-                    "chemistry": "Chemistry",
-                    "physics": "Physics",
-                },
-                2: {
-                    "drawing and projection": "Drawing and Projection",
-                    "math": "Math 2",
-                    "mechanics": "Mechanics 2",
-                    "physics": "Physics 2",
-                    "production technology": "Production Technology",
-                    "program": "Program",
-                    "تاريخ هندسي": "Engineering History"
-                }
-            },
-            "100": {
-                1: {
-                    "c++": "C++",
-                    "circuit theory": "Circuit Theory",
-                    "engineering materials": "Engineering Material",
-                    "machine mechanics": "Mechanics Of Machine",
-                    "math 3": "Math 3",
-                    "thermodynamics": "Thermodynamics"
-                },
-                2: {
-                    "electrical systems": "Electrical Systems",
-                    "human resource": "Human Resource",
-                    "introduction to law": "Introduction To Law",
-                    "introduction to mechatronics": "Intro to Mechatronics",
-                    "machine drawing": "Machine Drawing",
-                    "numerical techniques": "Numerical Techniques",
-                    "stress analysis": "Stress Analysis"
-                }
-            },
-            "200": {
-                1: {
-                    "electronics": "Engineering Electronics",
-                    "fluid mechanics": "Fluid Mechanics",
-                    "machine theory": "Machine Theory",
-                    "manufacturing processes": "Manufacturing Processes",
-                    "project management": "Project Management",
-                    "seminar_": "Seminar",
-                    "statistics": "Statistics"
-                }
-            }
+    },
+    "100": {
+        1: {
+            "c++": "C++",
+            "circuit theory": "Circuit Theory",
+            "engineering materials": "Engineering Material",
+            "machine mechanics": "Mechanics Of Machine",
+            "math 3": "Math 3",
+            "thermodynamics": "Thermodynamics"
+        },
+        2: {
+            "electrical systems": "Electrical Systems",
+            "human resource": "Human Resource",
+            "introduction to law": "Introduction To Law",
+            "introduction to mechatronics": "Intro to Mechatronics",
+            "machine drawing": "Machine Drawing",
+            "numerical techniques": "Numerical Techniques",
+            "stress analysis": "Stress Analysis"
         }
-        
-        # Category mapping (Lower Case Folder Name -> RESOURCE_TYPES Choice)
-        category_map = {
-            "lecture": "Lectures",
-            "lectures": "Lectures",
-            "practical": "Lectures",
-            "projection": "Lectures",
-            "drawing book": "Lectures", # Mapping book as lectures/explanation
-            "sheet": "Sheets",
-            "sheets": "Sheets",
-            "assignment": "Sheets",
-            "workshop": "Sheets",
-            "solution sheet_": "Sheets",
-            "solution drawing book": "Sheets",
-            "mid term": "Midterm",
-            "midterm": "Midterm",
-            "final": "Final",
-            "revision": "Revision",
-            "reviews": "Revision",
-            "review": "Revision",
-            "review 2024": "Revision",
-            "explanation": "Explanation",
-            "lab": "Explanation",
-            "practical mechanics": "Explanation",
-            "quiz": "Midterm",
-            "midtrem": "Midterm",
-            "midterm-20260124t111155z-3-001": "Midterm",
-            "lap": "Explanation",
-            "labs": "Explanation",
-            "midterm solution": "Midterm",
-            "mid": "Midterm",
-            "exams": "Final",
-            "exam": "Final",
-            "quizzes": "Midterm",
-            "quizzes_": "Midterm",
-            "report": "Sheets",
-            "projects": "Sheets",
-            "sheet solution": "Sheets",
-            "sheet_": "Sheets",
-            "revsion": "Revision",
-            "mid and final": "Final",
-            "midterm and final": "Final",
-            "assignment_": "Sheets",
+    },
+    "200": {
+        1: {
+            "electronics": "Engineering Electronics",
+            "fluid mechanics": "Fluid Mechanics",
+            "machine theory": "Machine Theory",
+            "manufacturing processes": "Manufacturing Processes",
+            "project management": "Project Management",
+            "seminar_": "Seminar",
+            "statistics": "Statistics"
         }
+    }
+}
+
+# Category mapping (Lower Case Folder Name -> RESOURCE_TYPES Choice)
+CATEGORY_MAP = {
+    "lecture": "Lectures",
+    "lectures": "Lectures",
+    "practical": "Lectures",
+    "projection": "Lectures",
+    "drawing book": "Lectures", # Mapping book as lectures/explanation
+    "sheet": "Sheets",
+    "sheets": "Sheets",
+    "assignment": "Sheets",
+    "workshop": "Sheets",
+    "solution sheet_": "Sheets",
+    "solution drawing book": "Sheets",
+    "mid term": "Midterm",
+    "midterm": "Midterm",
+    "final": "Final",
+    "revision": "Revision",
+    "reviews": "Revision",
+    "review": "Revision",
+    "review 2024": "Revision",
+    "explanation": "Explanation",
+    "lab": "Explanation",
+    "practical mechanics": "Explanation",
+    "quiz": "Midterm",
+    "midtrem": "Midterm",
+    "midterm-20260124t111155z-3-001": "Midterm",
+    "lap": "Explanation",
+    "labs": "Explanation",
+    "midterm solution": "Midterm",
+    "mid": "Midterm",
+    "exams": "Final",
+    "exam": "Final",
+    "quizzes": "Midterm",
+    "quizzes_": "Midterm",
+    "report": "Sheets",
+    "projects": "Sheets",
+    "sheet solution": "Sheets",
+    "sheet_": "Sheets",
+    "revsion": "Revision",
+    "mid and final": "Final",
+    "midterm and final": "Final",
+    "assignment_": "Sheets",
+}
+
+
+class Command(BaseCommand):
+    help = 'Import organized resources from media/resources/Level000'
+
+    def handle(self, *args, **options):
+        # One stats refresh per touched subject at the end instead of one per created resource
+        with defer_stats_refresh():
+            self.import_tree()
+
+    def import_tree(self):
+        level_map = LEVEL_MAP
+        term_map = TERM_MAP
+        subject_map = SUBJECT_MAP
+        category_map = CATEGORY_MAP
 
         resources_base = os.path.join(settings.MEDIA_ROOT, 'resources')
         
@@ -0,0 +1,31 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from hub.notifications import prune_notifications, collapse_import_notifications
+
+
+class Command(BaseCommand):
+    help = 'Deletes read notifications and broadcasts past the retention age, optionally collapsing repeated import notices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 120),
+                            help='Delete read notifications older than this many days (default NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per transaction')
+        parser.add_argument('--collapse-imports', action='store_true',
+                            help='Merge repeated "New Resources Imported" notices for the same subject into one row')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        collapsed = 0
+        if options['collapse_imports']:
+            collapsed = collapse_import_notifications(batch_size=options['batch_size'])
+            self.stdout.write(f'Collapsed import notices: {collapsed} rows merged away')
+
+        personal, broadcasts = prune_notifications(options['days'], batch_size=options['batch_size'])
+        self.stdout.write(f'Pruned {personal} read notifications and {broadcasts} broadcasts older than {options["days"]} days')
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Done! Removed {collapsed + personal + broadcasts} rows in {elapsed:.2f}s.'
+        ))
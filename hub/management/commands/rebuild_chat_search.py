@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from hub.chat_search import repair_sqlite_fts
+
+
+class Command(BaseCommand):
+    help = 'Reinstalls the SQLite FTS5 chat search index and its triggers and rebuilds it from hub_chatmessage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-missing', action='store_true', help='Only rebuild when the table or a trigger is missing')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f'Nothing to do on {connection.vendor}: the search index is a regular database index.')
+            return
+        start = time.perf_counter()
+        rebuilt = repair_sqlite_fts(force=not options['if_missing'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Done! Chat search index {"rebuilt" if rebuilt else "already complete"} in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hub.models import SubjectResourceStats
+from hub.resource_stats import rebuild_all_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every subject\'s resource counts (SubjectResourceStats); for backfills and after raw SQL edits'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rebuild_all_stats()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Done! Rebuilt stats for {SubjectResourceStats.objects.count()} subjects in {elapsed:.2f}s.'
+        ))
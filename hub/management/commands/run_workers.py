@@ -0,0 +1,56 @@
+import os
+import signal
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from hub.jobs import STALE_AFTER, requeue_stale_jobs, work
+
+
+class Command(BaseCommand):
+    help = 'Runs background job workers (Drive imports, notification fan-outs) from the ImportJob table; no external broker needed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Worker threads in this process')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling forever')
+        parser.add_argument('--stale-after', type=int, default=int(STALE_AFTER.total_seconds() // 60),
+                            help='Requeue jobs left running by a dead worker after this many minutes')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale jobs'))
+
+        stopping = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                # Finish the job in hand, then exit
+                signal.signal(sig, lambda *args: stopping.set())
+
+        host = f'{socket.gethostname()}:{os.getpid()}'
+        counts = []
+        start = time.perf_counter()
+
+        def loop(n):
+            try:
+                counts.append(work(f'{host}:{n}', once=options['once'], poll_interval=options['poll_interval'],
+                                   stop=stopping.is_set, sleep=stopping.wait))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=loop, args=(n,), daemon=True) for n in range(options['workers'])]
+        self.stdout.write(f'Started {len(threads)} worker(s) on {host}')
+        for thread in threads:
+            thread.start()
+        # Join with a timeout so signals are still delivered to the main thread
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Done! Ran {sum(counts)} jobs in {elapsed:.2f}s.'))
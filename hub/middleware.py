@@ -0,0 +1,187 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.http import HttpResponse, JsonResponse
+
+# Chat polling endpoints guarded by ChatPollThrottleMiddleware (url names inside the 'hub' namespace)
+THROTTLED_VIEWS = ('chat_get', 'chat_sessions')
+
+DEFAULTS = {
+    'BACKEND': 'memory',      # 'memory' (per process: limits multiply by the worker count) or 'cache' (shared)
+    'RATE': 1.0,              # tokens refilled per second
+    'BURST': 5,               # bucket size
+    'COALESCE_SECONDS': 1.0,  # identical polls inside this window get the previous response
+}
+
+STAT_NAMES = ('allowed', 'coalesced', 'throttled')
+
+# Coalesced responses, poll versions and 'cache' buckets are read and written on every poll, so they live
+# in their own alias: process-local memory by default (see CACHES in settings), never the database cache,
+# which would turn each poll into several extra queries.
+POLL_CACHE = 'chat_polls'
+
+
+def poll_cache():
+    try:
+        return caches[POLL_CACHE]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def get_throttle_settings():
+    conf = dict(DEFAULTS)
+    conf.update(getattr(settings, 'CHAT_POLL_THROTTLE', {}))
+    return conf
+
+
+class MemoryBucketBackend:
+    """Token buckets in a process-local dict. Cheap, but each gunicorn worker counts separately."""
+
+    max_keys = 10000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.counters = {}
+
+    def consume(self, key, rate, burst):
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if len(self.buckets) >= self.max_keys and key not in self.buckets:
+                # Forget the oldest clients instead of growing without bound
+                for stale in sorted(self.buckets, key=lambda k: self.buckets[k][1])[:self.max_keys // 10]:
+                    del self.buckets[stale]
+            self.buckets[key] = (tokens, now)
+        return allowed
+
+    def incr_stat(self, name):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+class CacheBucketBackend:
+    """
+    Token buckets stored in the 'chat_polls' cache (best effort, not atomic). Workers share them only when
+    that alias points at a shared in-memory server such as memcached or Redis.
+    """
+
+    prefix = 'chatpoll:bucket:'
+    stat_prefix = 'chatpoll:stat:'
+
+    def consume(self, key, rate, burst):
+        now = time.time()
+        tokens, last = poll_cache().get(self.prefix + key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Keep the entry only as long as it takes to refill completely
+        poll_cache().set(self.prefix + key, (tokens, now), timeout=int(burst / rate) + 1)
+        return allowed
+
+    def incr_stat(self, name):
+        key = self.stat_prefix + name
+        if not poll_cache().add(key, 1, timeout=None):
+            try:
+                poll_cache().incr(key)
+            except ValueError:
+                poll_cache().set(key, 1, timeout=None)
+
+    def stats(self):
+        return {name: poll_cache().get(self.stat_prefix + name, 0) for name in STAT_NAMES}
+
+
+_backends = {}
+
+
+def get_backend(name=None):
+    name = name or get_throttle_settings()['BACKEND']
+    if name not in _backends:
+        _backends[name] = CacheBucketBackend() if name == 'cache' else MemoryBucketBackend()
+    return _backends[name]
+
+
+def _version_key(session_token=None):
+    return f'chatpoll:version:{session_token}' if session_token else 'chatpoll:version:sessions'
+
+
+def invalidate_chat_polls(*session_tokens):
+    """
+    Makes the next poll skip the coalescing cache. Called whenever messages or sessions change:
+    bumps the sidebar version and the message-poll version of each given session.
+    Versions are timestamps (as in page_cache.bump_page_version), so any number of sessions is one
+    set_many and an evicted version can't come back equal to an old one.
+    """
+    now = time.time_ns()
+    keys = [_version_key()] + [_version_key(str(token)) for token in session_tokens if token]
+    poll_cache().set_many({key: now for key in keys}, timeout=None)
+
+
+class ChatPollThrottleMiddleware:
+    """
+    Token-bucket limiter and response coalescing for the chat polling endpoints.
+    Clients are keyed by user, or by chat session token for guests. A poll identical to one answered
+    less than COALESCE_SECONDS ago is served from cache without touching the database or a token.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        coalesce_key = getattr(request, '_chat_poll_coalesce_key', None)
+        if coalesce_key and response.status_code == 200:
+            timeout = get_throttle_settings()['COALESCE_SECONDS']
+            poll_cache().set(coalesce_key, (response.content, response['Content-Type']), timeout=timeout)
+        return response
+
+    def client_key(self, request):
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        token = request.GET.get('session_id')
+        if token:
+            return f'token:{token}'
+        return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if not match or match.namespace != 'hub' or match.url_name not in THROTTLED_VIEWS:
+            return None
+
+        conf = get_throttle_settings()
+        backend = get_backend(conf['BACKEND'])
+        client = self.client_key(request)
+
+        if conf['COALESCE_SECONDS']:
+            session_token = request.GET.get('session_id') if match.url_name == 'chat_get' else None
+            version = poll_cache().get(_version_key(session_token), 0)
+            coalesce_key = f'chatpoll:resp:{client}:{version}:{request.get_full_path()}'
+            cached = poll_cache().get(coalesce_key)
+            if cached is not None:
+                backend.incr_stat('coalesced')
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            request._chat_poll_coalesce_key = coalesce_key
+
+        if not backend.consume(f'{match.url_name}:{client}', conf['RATE'], conf['BURST']):
+            backend.incr_stat('throttled')
+            request._chat_poll_coalesce_key = None
+            response = JsonResponse({'success': False, 'error': 'Too many requests'}, status=429)
+            response['Retry-After'] = max(1, int(1 / conf['RATE']))
+            return response
+
+        backend.incr_stat('allowed')
+        return None
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub', '0022_subjectresource_solution_file_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='subjectresource',
+            name='category',
+            field=models.CharField(choices=[('Explanation', 'Explanation'), ('Lectures', 'Lectures'), ('Sheets', 'Sheets'), ('Midterm', 'Midterm'), ('Final', 'Final'), ('Revision', 'Revision'), ('Workshops', 'Workshops')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='ChatArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.BinaryField()),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='hub.chatsession')),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub', '0023_chatarchive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'id'], name='chatmessage_session_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'sender', 'is_read'], name='chatmessage_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-updated_at'], name='chatsession_active_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+        from hub.chat_search import PG_INDEX_NAME, PG_CONFIG
+
+        ChatMessage = apps.get_model('hub', 'ChatMessage')
+        schema_editor.add_index(ChatMessage, GinIndex(SearchVector('message', config=PG_CONFIG), name=PG_INDEX_NAME))
+    elif connection.vendor == 'sqlite':
+        from hub.chat_search import install_sqlite_fts
+
+        with connection.cursor() as cursor:
+            install_sqlite_fts(cursor)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        from hub.chat_search import PG_INDEX_NAME
+
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PG_INDEX_NAME}')
+    elif connection.vendor == 'sqlite':
+        from hub.chat_search import drop_sqlite_fts
+
+        with connection.cursor() as cursor:
+            drop_sqlite_fts(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub', '0024_chat_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
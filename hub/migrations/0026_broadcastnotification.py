@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub', '0025_chatmessage_fulltext_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('all', 'Everyone'), ('level', 'Level'), ('subject', 'Subject')], default='all', max_length=10)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('level', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='broadcasts', to='hub.level')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='broadcasts', to='hub.subject')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BroadcastNotificationRead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(auto_now_add=True)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reads', to='hub.broadcastnotification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_reads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'broadcast'), name='unique_broadcast_read')],
+            },
+        ),
+    ]
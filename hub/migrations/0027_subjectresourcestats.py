@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+CATEGORY_FIELDS = {
+    'Explanation': 'explanation_count',
+    'Lectures': 'lectures_count',
+    'Sheets': 'sheets_count',
+    'Midterm': 'midterm_count',
+    'Final': 'final_count',
+    'Revision': 'revision_count',
+    'Workshops': 'workshop_count',
+}
+
+
+def backfill_stats(apps, schema_editor):
+    Subject = apps.get_model('hub', 'Subject')
+    SubjectResource = apps.get_model('hub', 'SubjectResource')
+    SubjectResourceStats = apps.get_model('hub', 'SubjectResourceStats')
+
+    stats = {pk: SubjectResourceStats(subject_id=pk) for pk in Subject.objects.values_list('id', flat=True)}
+    grouped = SubjectResource.objects.values('subject_id', 'category').annotate(n=Count('id')).order_by()
+    for row in grouped:
+        obj = stats[row['subject_id']]
+        field = CATEGORY_FIELDS.get(row['category'])
+        if field:
+            setattr(obj, field, getattr(obj, field) + row['n'])
+        obj.total_count += row['n']
+    SubjectResourceStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub', '0026_broadcastnotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectResourceStats',
+            fields=[
+                ('subject', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resource_stats', serialize=False, to='hub.subject')),
+                ('explanation_count', models.PositiveIntegerField(default=0)),
+                ('lectures_count', models.PositiveIntegerField(default=0)),
+                ('sheets_count', models.PositiveIntegerField(default=0)),
+                ('midterm_count', models.PositiveIntegerField(default=0)),
+                ('final_count', models.PositiveIntegerField(default=0)),
+                ('revision_count', models.PositiveIntegerField(default=0)),
+                ('workshop_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
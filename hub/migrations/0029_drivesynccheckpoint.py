@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub', '0028_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriveSyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('Explanation', 'Explanation'), ('Lectures', 'Lectures'), ('Sheets', 'Sheets'), ('Midterm', 'Midterm'), ('Final', 'Final'), ('Revision', 'Revision'), ('Workshops', 'Workshops')], max_length=50)),
+                ('folder_id', models.CharField(max_length=255)),
+                ('last_modified', models.CharField(blank=True, help_text='Newest Drive modifiedTime seen (RFC 3339)', max_length=40)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('file_count', models.PositiveIntegerField(default=0)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drive_checkpoints', to='hub.subject')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('subject', 'category'), name='drive_checkpoint_target_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub', '0029_drivesynccheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriveListingCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('folder_id', models.CharField(max_length=255)),
+                ('scope', models.CharField(choices=[('files', 'Files'), ('children', 'Files and folders')], max_length=10)),
+                ('fields', models.CharField(max_length=255)),
+                ('items', models.JSONField(default=list)),
+                ('api_calls', models.PositiveIntegerField(default=0, help_text='List calls the last fetch took (saved per hit)')),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('fetches', models.PositiveIntegerField(default=0)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('folder_id', 'scope', 'fields'), name='drive_listing_cache_uniq')],
+            },
+        ),
+    ]
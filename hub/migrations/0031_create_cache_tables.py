@@ -0,0 +1,19 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    # The DatabaseCache tables of settings.CACHES ('default' and, with PAGE_CACHE_BACKEND=db, the page
+    # fragments). Without them every page that reads the cache fails after a plain `migrate`.
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub', '0030_drivelistingcache'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub', '0031_create_cache_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['-updated_at'], name='chatsession_ended_updated_idx'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 import os
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 
@@ -72,6 +72,63 @@ class SubjectResource(models.Model):
     def __str__(self):
         return f"{self.subject.name} - {self.category} - {self.preview_url or 'No URL'}"
 
+class SubjectResourceStats(models.Model):
+    # Materialized per-category resource counts for one subject (see hub/resource_stats.py).
+    # Field names match the annotations the subject card templates read.
+    subject = models.OneToOneField(Subject, on_delete=models.CASCADE, primary_key=True, related_name='resource_stats')
+    explanation_count = models.PositiveIntegerField(default=0)
+    lectures_count = models.PositiveIntegerField(default=0)
+    sheets_count = models.PositiveIntegerField(default=0)
+    midterm_count = models.PositiveIntegerField(default=0)
+    final_count = models.PositiveIntegerField(default=0)
+    revision_count = models.PositiveIntegerField(default=0)
+    workshop_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.subject.name} ({self.total_count} resources)"
+
+@receiver(pre_save, sender=SubjectResource)
+def remember_old_subject_on_resource_move(sender, instance, **kwargs):
+    # A resource moved to another subject (e.g. in the admin) changes the old subject's counts too
+    instance._moved_from_subject_id = None
+    if instance.pk:
+        instance._moved_from_subject_id = SubjectResource.objects.filter(pk=instance.pk).exclude(
+            subject_id=instance.subject_id).values_list('subject_id', flat=True).first()
+
+@receiver([post_save, post_delete], sender=SubjectResource)
+def refresh_stats_on_resource_change(sender, instance, **kwargs):
+    # Cascades from a Subject/Level delete (an instance or a queryset) take the stats row with them;
+    # don't recreate it
+    origin = kwargs.get('origin')
+    if isinstance(origin, (Subject, Level)) or getattr(origin, 'model', None) in (Subject, Level):
+        return
+    from .resource_stats import schedule_refresh
+    schedule_refresh(instance.subject_id)
+    moved_from = getattr(instance, '_moved_from_subject_id', None)
+    if moved_from:
+        instance._moved_from_subject_id = None
+        schedule_refresh(moved_from)
+
+@receiver(pre_save, sender=Subject)
+def invalidate_old_level_on_subject_move(sender, instance, **kwargs):
+    if instance.pk:
+        from .resource_stats import invalidate_level_subjects
+        invalidate_level_subjects(*Subject.objects.filter(pk=instance.pk).exclude(level_id=instance.level_id).values_list('level_id', flat=True))
+
+@receiver([post_save, post_delete], sender=Subject)
+def invalidate_level_subjects_on_subject_change(sender, instance, **kwargs):
+    from .page_cache import bump_page_version
+    from .resource_stats import invalidate_level_subjects
+    invalidate_level_subjects(instance.level_id)
+    bump_page_version('subject', instance.pk)
+
+@receiver([post_save, post_delete], sender=Level)
+def invalidate_level_pages_on_level_change(sender, instance, **kwargs):
+    from .page_cache import bump_page_version
+    bump_page_version('level', instance.pk)
+
 class StudentProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     level = models.ForeignKey(Level, on_delete=models.SET_NULL, null=True, blank=True)
@@ -86,7 +143,8 @@ class StudentProfile(models.Model):
 
     @property
     def unread_count(self):
-        return self.user.notifications.filter(is_read=False).count()
+        from .notifications import get_unread_count
+        return get_unread_count(self.user)
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -134,6 +192,59 @@ class Notification(models.Model):
     def __str__(self):
         return f"Notification for {self.user.username} - {self.title}"
 
+class BroadcastNotification(models.Model):
+    """
+    An announcement stored once for a whole audience instead of one Notification row per student.
+    Read state lives in BroadcastNotificationRead and is only written when a user actually reads it.
+    """
+    TARGET_CHOICES = [
+        ('all', 'Everyone'),
+        ('level', 'Level'),
+        ('subject', 'Subject'),
+    ]
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES, default='all')
+    level = models.ForeignKey(Level, on_delete=models.CASCADE, null=True, blank=True, related_name='broadcasts')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True, related_name='broadcasts')
+    title = models.CharField(max_length=255)
+    message = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Broadcast to {self.get_target_display()} - {self.title}"
+
+class BroadcastNotificationRead(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='broadcast_reads')
+    broadcast = models.ForeignKey(BroadcastNotification, on_delete=models.CASCADE, related_name='reads')
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'broadcast'], name='unique_broadcast_read'),
+        ]
+
+# Keep the cached navbar notification summary (hub/notifications.py) in step with the data it shows
+@receiver([post_save, post_delete], sender=Notification)
+def invalidate_summary_on_notification(sender, instance, **kwargs):
+    from .notifications import invalidate_notification_summary
+    invalidate_notification_summary(instance.user_id)
+
+@receiver([post_save, post_delete], sender=BroadcastNotification)
+def invalidate_summaries_on_broadcast(sender, instance, **kwargs):
+    from .notifications import invalidate_broadcast_summaries
+    invalidate_broadcast_summaries()
+
+@receiver(post_save, sender=StudentProfile)
+def invalidate_summary_on_profile(sender, instance, **kwargs):
+    # A level change changes which broadcasts the student sees
+    from .notifications import invalidate_notification_summary
+    invalidate_notification_summary(instance.user_id)
+
+@receiver(m2m_changed, sender=StudentProfile.registered_subjects.through)
+def invalidate_summary_on_registration(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, StudentProfile):
+        from .notifications import invalidate_notification_summary
+        invalidate_notification_summary(instance.user_id)
+
 
 class SemesterConfiguration(models.Model):
     current_semester = models.IntegerField(choices=[(1, 'Semester 1'), (2, 'Semester 2')], default=1)
@@ -145,8 +256,9 @@ class SemesterConfiguration(models.Model):
 
     @classmethod
     def get_current_semester(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj.current_semester
+        # Read-only: until an admin switches semesters there is no row, and the field default applies
+        current = cls.objects.filter(pk=1).values_list('current_semester', flat=True).first()
+        return current if current is not None else cls._meta.get_field('current_semester').default
 
     def __str__(self):
         return f"System Configuration: Semester {self.current_semester}"
@@ -169,6 +281,16 @@ class ChatSession(models.Model):
             return f"Chat with {self.user.username}"
         return f"Chat with {self.guest_name or 'Guest'}"
 
+    class Meta:
+        indexes = [
+            # Admin sidebar poll: filter(is_active=True).order_by('-updated_at').
+            # Partial rather than (is_active, -updated_at): Django emits a bare "WHERE is_active",
+            # which SQLite only matches against an index condition, not a leading boolean column.
+            models.Index(fields=['-updated_at'], condition=models.Q(is_active=True), name='chatsession_active_updated_idx'),
+            # Archived sidebar: filter(is_active=False).order_by('-updated_at')[:50]
+            models.Index(fields=['-updated_at'], condition=models.Q(is_active=False), name='chatsession_ended_updated_idx'),
+        ]
+
     @property
     def unread_for_admin(self):
         return self.messages.filter(sender='student', is_read=False).count()
@@ -186,6 +308,33 @@ class ChatMessage(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Message poll: filter(session=..., id__gt=last_id).order_by('id')
+            models.Index(fields=['session', 'id'], name='chatmessage_session_id_idx'),
+            # Unread badge / mark read: filter(session=..., sender='student', is_read=False)
+            models.Index(fields=['session', 'sender', 'is_read'], name='chatmessage_unread_idx'),
+        ]
+
+@receiver(post_migrate)
+def repair_chat_search_index(sender, using, **kwargs):
+    # Django's SQLite migrations rebuild tables on AlterField, which silently drops the FTS triggers;
+    # reinstall them here so searches never have to
+    if sender.name == 'hub':
+        from .chat_search import repair_sqlite_fts
+        repair_sqlite_fts(using)
+
+class ChatArchive(models.Model):
+    # Cold storage for the history of long-inactive sessions (see hub/chat_archive.py).
+    # Messages are kept as one zlib-compressed JSON list per session so ChatMessage stays small.
+    session = models.OneToOneField(ChatSession, on_delete=models.CASCADE, related_name='archive')
+    payload = models.BinaryField()
+    message_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Archive of {self.session} ({self.message_count} messages)"
+
 class AIChatSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_chat_sessions')
     title = models.CharField(max_length=255, default="New Chat")
@@ -223,3 +372,86 @@ class UniversityKnowledge(models.Model):
 
     class Meta:
         verbose_name_plural = "University Knowledge"
+
+class ImportJob(models.Model):
+    """
+    A unit of background work (Drive imports, notification fan-outs) queued by the web process and executed by
+    `manage.py run_workers` (see hub/jobs.py). Progress and results are written back to the row.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job: filter(status='queued').order_by('id')
+            models.Index(fields=['status', 'id'], name='importjob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class DriveSyncCheckpoint(models.Model):
+    """
+    What the last Drive sync saw for one subject/category target: the source folder, the newest
+    modifiedTime and a fingerprint of the listing. A re-import whose listing matches is skipped.
+    """
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='drive_checkpoints')
+    category = models.CharField(max_length=50, choices=SubjectResource.RESOURCE_TYPES)
+    folder_id = models.CharField(max_length=255)
+    last_modified = models.CharField(max_length=40, blank=True, help_text="Newest Drive modifiedTime seen (RFC 3339)")
+    fingerprint = models.CharField(max_length=64)
+    file_count = models.PositiveIntegerField(default=0)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['subject', 'category'], name='drive_checkpoint_target_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject.name} - {self.category} @ {self.last_modified or 'never'}"
+
+
+class DriveListingCache(models.Model):
+    """
+    A cached Drive folder listing (see hub/drive_cache.py): the items of one files().list query
+    for a folder, reused until DRIVE_CACHE_TTL expires or an admin refreshes it.
+    """
+    SCOPE_CHOICES = [
+        ('files', 'Files'),
+        ('children', 'Files and folders'),
+    ]
+    folder_id = models.CharField(max_length=255)
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    fields = models.CharField(max_length=255)
+    items = models.JSONField(default=list)
+    api_calls = models.PositiveIntegerField(default=0, help_text="List calls the last fetch took (saved per hit)")
+    hits = models.PositiveIntegerField(default=0)
+    fetches = models.PositiveIntegerField(default=0)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['folder_id', 'scope', 'fields'], name='drive_listing_cache_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.folder_id} ({self.scope}, {len(self.items)} items)"
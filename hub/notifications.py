@@ -0,0 +1,343 @@
+import itertools
+import re
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import CharField, Exists, F, OuterRef, Q, Value
+from django.utils import timezone
+
+from .models import Notification, BroadcastNotification, BroadcastNotificationRead, StudentProfile
+
+# Per-user dropdown summary cache. The timeout is only a safety net for per-process caches;
+# normal invalidation happens through the signals in models.py.
+SUMMARY_TIMEOUT = 60 * 5
+SUMMARY_FEED_SIZE = 15
+BROADCAST_VERSION_KEY = 'notify:broadcast-version'
+
+_deferred = threading.local()
+
+
+# Audiences a queued fan-out can target (the job payload is JSON, so it names one instead of holding a queryset)
+FAN_OUT_AUDIENCES = {
+    'staff': lambda: User.objects.filter(is_staff=True),
+}
+
+
+def _recipient_id_batches(recipients, batch_size):
+    ids = recipients.order_by('id').values_list('id', flat=True)
+    if connection.vendor != 'sqlite':
+        # Server-side cursor: ids stream in chunks without loading the whole user list
+        stream = ids.iterator(chunk_size=batch_size)
+        while True:
+            batch = list(itertools.islice(stream, batch_size))
+            if not batch:
+                return
+            yield batch
+    # SQLite has no server-side cursors, and a read cursor held open across the inserts makes concurrent
+    # writers fail with "database is locked", so ids are paged by key instead (id > last, LIMIT n)
+    last_id = 0
+    while True:
+        batch = list(ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def fan_out(recipients, title, message, batch_size=500, progress=None):
+    """
+    Creates one Notification per recipient with batched bulk_create.
+    `recipients` is a User queryset whose ids are streamed one batch at a time.
+    `progress(sent, total, message)` is called after each batch.
+    Returns the number of notifications created.
+    """
+    progress = progress or (lambda *args: None)
+    total = recipients.count()
+    sent = 0
+    for batch in _recipient_id_batches(recipients, batch_size):
+        Notification.objects.bulk_create([
+            Notification(user_id=user_id, title=title, message=message) for user_id in batch
+        ])
+        # bulk_create skips post_save, so drop the recipients' cached summaries here
+        invalidate_notification_summary(*batch)
+        sent += len(batch)
+        progress(sent, total, "Sending notifications")
+    return sent
+
+
+def enqueue_fan_out(audience, title, message, user=None):
+    """
+    Queues a fan-out to one of FAN_OUT_AUDIENCES as an ImportJob, so the request only writes one row;
+    `manage.py run_workers` sends it and records progress on the job.
+    """
+    from .jobs import enqueue
+    if audience not in FAN_OUT_AUDIENCES:
+        raise ValueError(f"Unknown fan-out audience '{audience}'")
+    return enqueue('notification_fan_out', {'audience': audience, 'title': title, 'message': message}, user=user)
+
+
+def broadcast_notification(title, message, level=None, subject=None):
+    """
+    Announces something to a whole audience with a single row: a subject's registered students,
+    a level's students, or everyone when neither is given.
+    """
+    if subject is not None:
+        target = 'subject'
+    elif level is not None:
+        target = 'level'
+    else:
+        target = 'all'
+    return BroadcastNotification.objects.create(target=target, level=level, subject=subject, title=title, message=message)
+
+
+def visible_broadcasts(user):
+    """Broadcasts addressed to `user`, as one queryset (level and subjects are resolved in subqueries)."""
+    profile = StudentProfile.objects.filter(user=user)
+    return BroadcastNotification.objects.filter(
+        Q(target='all') |
+        Q(target='level', level__in=profile.values('level')) |
+        Q(target='subject', subject__in=profile.values('registered_subjects')),
+        # Announcements made before the account existed aren't news to it
+        created_at__gte=user.date_joined,
+    )
+
+
+def _feed_querysets(user):
+    read = BroadcastNotificationRead.objects.filter(user=user, broadcast=OuterRef('pk'))
+    personal = user.notifications.annotate(
+        read=F('is_read'),
+        kind=Value('personal', output_field=CharField()),
+    ).values('id', 'title', 'message', 'created_at', 'read', 'kind')
+    broadcasts = visible_broadcasts(user).annotate(
+        read=Exists(read),
+        kind=Value('broadcast', output_field=CharField()),
+    ).values('id', 'title', 'message', 'created_at', 'read', 'kind')
+    return personal, broadcasts
+
+
+def get_notification_feed(user, limit=15):
+    """
+    Latest personal and broadcast notifications for a user, merged with a single UNION query.
+    Items are dicts with title, message, created_at, is_read and kind ('personal' or 'broadcast').
+    """
+    personal, broadcasts = _feed_querysets(user)
+    items = list(personal.union(broadcasts, all=True).order_by('-created_at')[:limit])
+    for item in items:
+        item['is_read'] = bool(item.pop('read'))
+    return items
+
+
+def get_unread_count(user):
+    read = BroadcastNotificationRead.objects.filter(user=user, broadcast=OuterRef('pk'))
+    personal = user.notifications.filter(is_read=False).values('id')
+    broadcasts = visible_broadcasts(user).filter(~Exists(read)).values('id')
+    return personal.union(broadcasts, all=True).count()
+
+
+def mark_all_read(user):
+    """Marks personal notifications read and records a read row for each unread broadcast."""
+    user.notifications.filter(is_read=False).update(is_read=True)
+    read = BroadcastNotificationRead.objects.filter(user=user, broadcast=OuterRef('pk'))
+    unread_ids = visible_broadcasts(user).filter(~Exists(read)).values_list('id', flat=True)
+    BroadcastNotificationRead.objects.bulk_create(
+        [BroadcastNotificationRead(user=user, broadcast_id=broadcast_id) for broadcast_id in unread_ids],
+        ignore_conflicts=True,
+    )
+    invalidate_notification_summary(user.pk)
+
+
+def _summary_key(user_id):
+    return f'notify:summary:{user_id}'
+
+
+def get_notification_summary(user):
+    """
+    {'unread_count': int, 'items': latest feed items} for the navbar dropdown, served from the cache.
+    A cached summary is reused only while the global broadcast version it was built for is current.
+    """
+    key = _summary_key(user.pk)
+    cached = cache.get_many([key, BROADCAST_VERSION_KEY])
+    version = cached.get(BROADCAST_VERSION_KEY, 0)
+    summary = cached.get(key)
+    if summary is not None and summary['broadcast_version'] == version:
+        return summary
+
+    summary = {
+        'unread_count': get_unread_count(user),
+        'items': get_notification_feed(user, limit=SUMMARY_FEED_SIZE),
+        'broadcast_version': version,
+    }
+    cache.set(key, summary, timeout=SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_notification_summary(*user_ids):
+    pending = getattr(_deferred, 'pending', None)
+    if pending is not None:
+        pending['user_ids'].update(user_ids)
+        return
+    cache.delete_many([_summary_key(user_id) for user_id in user_ids])
+
+
+def invalidate_broadcast_summaries():
+    """A new broadcast can concern any user, so every cached summary is retired by bumping one version."""
+    pending = getattr(_deferred, 'pending', None)
+    if pending is not None:
+        pending['broadcasts'] = True
+        return
+    if not cache.add(BROADCAST_VERSION_KEY, 1, timeout=None):
+        try:
+            cache.incr(BROADCAST_VERSION_KEY)
+        except ValueError:
+            cache.set(BROADCAST_VERSION_KEY, 1, timeout=None)
+
+
+@contextmanager
+def defer_summary_invalidation():
+    """
+    Collects the summary invalidations fired by the Notification/BroadcastNotification signals inside the
+    block and applies them once at the end (one delete_many, at most one version bump) instead of once
+    per saved or deleted row.
+    """
+    if getattr(_deferred, 'pending', None) is not None:
+        # Nested block: the outermost one invalidates
+        yield
+        return
+    _deferred.pending = {'user_ids': set(), 'broadcasts': False}
+    try:
+        yield
+    finally:
+        pending, _deferred.pending = _deferred.pending, None
+        if pending['user_ids']:
+            invalidate_notification_summary(*pending['user_ids'])
+        if pending['broadcasts']:
+            invalidate_broadcast_summaries()
+
+
+# --- Retention -------------------------------------------------------------
+
+IMPORT_TITLE = "New Resources Imported"
+# drive_import's per-subject and per-level messages, and the summaries collapse_import_notifications
+# writes in their place (which must match again so later runs fold into them)
+SUBJECT_IMPORT_RE = re.compile(r'^(\d+) new (?:.+? )?files have been added for (.+?)(?: across (\d+) imports)?\.$')
+LEVEL_IMPORT_RE = re.compile(r'^(\d+) new files have been added across (?:\d+ )?(.+?) folders(?: in (\d+) imports)?\.$')
+
+
+def _delete_in_batches(queryset, batch_size):
+    """
+    Deletes a queryset one primary-key batch per transaction so no statement holds a long table lock.
+    Summary invalidations from the delete signals are applied once per batch.
+    """
+    model = queryset.model
+    ids_query = queryset.order_by('pk').values_list('pk', flat=True)
+    deleted = 0
+    while True:
+        ids = list(ids_query[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic(), defer_summary_invalidation():
+            model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def read_by_everyone():
+    """
+    Broadcasts that every user in their audience (as resolved by visible_broadcasts) has read:
+    no addressed user lacks a BroadcastNotificationRead row.
+    """
+    unread = ~Exists(BroadcastNotificationRead.objects.filter(user=OuterRef('pk'), broadcast=OuterRef(OuterRef('pk'))))
+    audience = User.objects.filter(unread, date_joined__lte=OuterRef('created_at'))
+    return BroadcastNotification.objects.filter(
+        Q(target='all') & ~Exists(audience) |
+        Q(target='level') & ~Exists(audience.filter(profile__level=OuterRef('level'))) |
+        Q(target='subject') & ~Exists(audience.filter(profile__registered_subjects=OuterRef('subject')))
+    )
+
+
+def prune_notifications(days, batch_size=1000):
+    """
+    Deletes read personal notifications and broadcasts read by their whole audience, older than `days` days.
+    Returns (personal_deleted, broadcasts_deleted).
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    personal = _delete_in_batches(Notification.objects.filter(is_read=True, created_at__lt=cutoff), batch_size)
+    broadcasts = _delete_in_batches(read_by_everyone().filter(created_at__lt=cutoff), batch_size)
+    return personal, broadcasts
+
+
+def _parse_import_message(message):
+    """(group, files, imports) for an import notice or an earlier summary, else None."""
+    for kind, pattern in (('subject', SUBJECT_IMPORT_RE), ('level', LEVEL_IMPORT_RE)):
+        match = pattern.match(message or '')
+        if match:
+            return (kind, match.group(2)), int(match.group(1)), int(match.group(3) or 1)
+    return None
+
+
+def _summary_message(group, files, imports):
+    kind, name = group
+    if kind == 'subject':
+        return f"{files} new files have been added for {name} across {imports} imports."
+    return f"{files} new files have been added across {name} folders in {imports} imports."
+
+
+def _collapse(rows, owner_field):
+    """
+    Groups "New Resources Imported" rows by owner (user or level) and subject, or level for the
+    level-wide imports. Returns ({kept_id: summary message}, [ids to delete]); the newest row of each
+    group is kept.
+    """
+    groups = {}
+    for row in rows:
+        parsed = _parse_import_message(row['message'])
+        if not parsed:
+            continue
+        group, files, imports = parsed
+        groups.setdefault((row[owner_field], group), []).append((row['id'], files, imports))
+
+    summaries = {}
+    to_delete = []
+    for (owner, group), entries in groups.items():
+        if len(entries) < 2:
+            continue
+        entries.sort()
+        keep_id = entries[-1][0]
+        summaries[keep_id] = _summary_message(
+            group, sum(files for _, files, _ in entries), sum(imports for _, _, imports in entries),
+        )
+        to_delete.extend(row_id for row_id, _, _ in entries[:-1])
+    return summaries, to_delete
+
+
+def collapse_import_notifications(batch_size=1000):
+    """
+    Collapses repeated "New Resources Imported" notices for the same subject, or for the same level's
+    crawls, into one summary row: read personal rows per user, and broadcasts per level.
+    Returns the number of rows removed.
+    """
+    removed = 0
+    sources = [
+        (Notification, Notification.objects.filter(title=IMPORT_TITLE, is_read=True), 'user_id'),
+        (BroadcastNotification, BroadcastNotification.objects.filter(title=IMPORT_TITLE, target='level'), 'level_id'),
+    ]
+    for model, queryset, owner_field in sources:
+        rows = queryset.values('id', 'message', owner_field).iterator(chunk_size=batch_size)
+        summaries, to_delete = _collapse(rows, owner_field)
+
+        kept = list(model.objects.filter(id__in=list(summaries)))
+        for obj in kept:
+            obj.message = summaries[obj.id]
+        model.objects.bulk_update(kept, ['message'], batch_size=batch_size)
+
+        for start in range(0, len(to_delete), batch_size):
+            with transaction.atomic(), defer_summary_invalidation():
+                model.objects.filter(id__in=to_delete[start:start + batch_size]).delete()
+        removed += len(to_delete)
+
+    if removed:
+        invalidate_broadcast_summaries()
+    return removed
@@ -0,0 +1,49 @@
+import os
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.shortcuts import render
+from django.template.loader import get_template
+from django.utils.translation import get_language
+
+# Rendered fragments live in the 'template_fragments' cache, the alias Django's {% cache %} tag uses
+# (see CACHES in settings: locmem, file or database, no Redis needed). Static pages are keyed by their
+# template's mtime, so editing a template retires its cached copy. Level and subject fragments include
+# a version that the signals in models.py bump when resources or subjects change.
+FRAGMENT_CACHE = 'template_fragments'
+
+
+def fragment_cache():
+    try:
+        return caches[FRAGMENT_CACHE]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def static_page_key(template_name):
+    template = get_template(template_name)
+    mtime = os.stat(template.origin.name).st_mtime_ns
+    return f'{template_name}:{mtime}:{get_language()}'
+
+
+def render_static_page(request, template_name):
+    """Renders an info page whose content block is wrapped in {% cache None static_page page_cache_key %}."""
+    return render(request, template_name, {'page_cache_key': static_page_key(template_name)})
+
+
+def _version_key(kind, pk):
+    return f'pages:version:{kind}:{pk}'
+
+
+def page_version(kind, pk):
+    """
+    Current version of a level/subject page. Versions are timestamps rather than counters, so a version
+    that was evicted comes back as a new value and can never match a fragment rendered from older data.
+    """
+    return fragment_cache().get_or_set(_version_key(kind, pk), time.time_ns, timeout=None)
+
+
+def bump_page_version(kind, *pks):
+    now = time.time_ns()
+    fragment_cache().set_many({_version_key(kind, pk): now for pk in pks}, timeout=None)
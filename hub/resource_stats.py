@@ -0,0 +1,136 @@
+import threading
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce
+
+from .models import Subject, SubjectResource, SubjectResourceStats
+from .page_cache import bump_page_version
+
+# SubjectResource.category -> SubjectResourceStats field
+CATEGORY_FIELDS = {
+    'Explanation': 'explanation_count',
+    'Lectures': 'lectures_count',
+    'Sheets': 'sheets_count',
+    'Midterm': 'midterm_count',
+    'Final': 'final_count',
+    'Revision': 'revision_count',
+    'Workshops': 'workshop_count',
+}
+COUNT_FIELDS = list(CATEGORY_FIELDS.values()) + ['total_count']
+
+# Annotated subject lists per level for LevelDetailView. Invalidated by the Subject signals in models.py
+# and by every stats refresh; the timeout only bounds staleness for per-process caches.
+LEVEL_SUBJECTS_TIMEOUT = 60 * 60
+
+_deferred = threading.local()
+
+
+def refresh_subject_stats(*subject_ids):
+    """Recomputes the stats rows for the given subjects with one grouped query."""
+    # Subjects deleted meanwhile (e.g. at the end of a deferred block) get no stats row
+    levels = dict(Subject.objects.filter(id__in=[pk for pk in subject_ids if pk is not None]).values_list('id', 'level_id'))
+    subject_ids = set(levels)
+    if not subject_ids:
+        return
+    rows = {pk: dict.fromkeys(COUNT_FIELDS, 0) for pk in subject_ids}
+    grouped = (
+        SubjectResource.objects.filter(subject_id__in=subject_ids)
+        .values('subject_id', 'category')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for row in grouped:
+        counts = rows[row['subject_id']]
+        field = CATEGORY_FIELDS.get(row['category'])
+        if field:
+            counts[field] += row['n']
+        counts['total_count'] += row['n']
+
+    SubjectResourceStats.objects.bulk_create(
+        [SubjectResourceStats(subject_id=pk, **counts) for pk, counts in rows.items()],
+        update_conflicts=True,
+        unique_fields=['subject'],
+        update_fields=COUNT_FIELDS + ['updated_at'],
+    )
+    invalidate_level_subjects(*set(levels.values()))
+    bump_page_version('subject', *subject_ids)
+
+
+def category_counts(subject_id):
+    """{category: count} for one subject, from a single grouped query."""
+    grouped = (
+        SubjectResource.objects.filter(subject_id=subject_id)
+        .values('category')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    return {row['category']: row['n'] for row in grouped}
+
+
+def rebuild_all_stats():
+    """Recomputes every subject's stats; for backfills and after raw SQL edits."""
+    refresh_subject_stats(*Subject.objects.values_list('id', flat=True))
+
+
+def schedule_refresh(subject_id):
+    """Called from the SubjectResource signals: refreshes now, or at the end of a defer_stats_refresh() block."""
+    pending = getattr(_deferred, 'subject_ids', None)
+    if pending is not None:
+        pending.add(subject_id)
+    else:
+        refresh_subject_stats(subject_id)
+
+
+@contextmanager
+def defer_stats_refresh():
+    """
+    Collects the subjects touched by imports inside the block and refreshes each of them once at the end,
+    instead of once per saved or deleted resource. Also the hook for bulk_create/bulk_update, which send no
+    signals: pass the affected subject ids to the yielded set.
+    """
+    if getattr(_deferred, 'subject_ids', None) is not None:
+        # Nested block: the outermost one does the refresh
+        yield _deferred.subject_ids
+        return
+    _deferred.subject_ids = set()
+    try:
+        yield _deferred.subject_ids
+    finally:
+        subject_ids, _deferred.subject_ids = _deferred.subject_ids, None
+        refresh_subject_stats(*subject_ids)
+
+
+def with_resource_counts(subjects):
+    """
+    Annotates a Subject queryset with the per-category `*_count` fields (and `file_count`) from
+    SubjectResourceStats. It is a primary-key join, so no resource rows are scanned or grouped.
+    """
+    annotations = {
+        field: Coalesce(F(f'resource_stats__{field}'), Value(0))
+        for field in CATEGORY_FIELDS.values()
+    }
+    annotations['file_count'] = Coalesce(F('resource_stats__total_count'), Value(0))
+    return subjects.annotate(**annotations)
+
+
+def _level_subjects_key(level_id):
+    return f'levels:subjects:{level_id}'
+
+
+def get_level_subjects(level):
+    """All subjects of a level ordered by semester and name, annotated with counts, served from the cache."""
+    key = _level_subjects_key(level.pk)
+    subjects = cache.get(key)
+    if subjects is None:
+        subjects = list(
+            with_resource_counts(Subject.objects.filter(level=level).select_related('level')).order_by('semester', 'name')
+        )
+        cache.set(key, subjects, timeout=LEVEL_SUBJECTS_TIMEOUT)
+    return subjects
+
+
+def invalidate_level_subjects(*level_ids):
+    cache.delete_many([_level_subjects_key(level_id) for level_id in level_ids])
+    bump_page_version('level', *level_ids)
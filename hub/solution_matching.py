@@ -0,0 +1,196 @@
+"""
+Matches solution files to the sheet, lecture or exam they answer, for Drive imports.
+
+Titles are tokenized (English and Arabic, Arabic-Indic digits folded to ASCII) and indexed three ways:
+by the title with its solution words removed, by (kind, number) such as ('sheet', 3), and by
+distinctive token for a fuzzy fallback. Every lookup touches a bounded number of candidates, so
+matching a folder is linear in its size.
+"""
+import itertools
+import re
+from dataclasses import dataclass
+
+_EXTENSION_RE = re.compile(r'\.(pdf|txt|docx?|pptx?|xlsx?|jpe?g|png|zip|rar)$', re.IGNORECASE)
+_TOKEN_RE = re.compile(r'\d+|[^\W\d_]+')
+_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+_YEAR_RE = re.compile(r'^(19|20)\d\d$')
+
+# "حل" etc. with the Arabic article: "الحل" -> "حل"
+_ARABIC_ARTICLE = 'ال'
+
+SOLUTION_TOKENS = {
+    'solution', 'solutions', 'answer', 'answers',
+    'حل', 'حلول', 'اجابة', 'اجابات', 'إجابة', 'إجابات', 'اجابه',
+}
+# Abbreviations that are also ordinary title words ("Lecture 3 Key Concepts"): they only mark a
+# solution right before a kind word ("Sol Sheet 3") or closing the title after one or a number
+# ("Sheet 3 Key"). "Model answer" and "نموذج إجابة" are caught by their answer word; on its own
+# "model"/"نموذج" usually means a sample exam, not its solution.
+ABBREVIATED_SOLUTION_TOKENS = {'sol', 'sols', 'ans', 'key'}
+
+KIND_TOKENS = {
+    'sheet': 'sheet', 'sheets': 'sheet', 'sh': 'sheet', 'شيت': 'sheet',
+    'assignment': 'sheet', 'assign': 'sheet', 'hw': 'sheet', 'homework': 'sheet',
+    'tutorial': 'sheet', 'tut': 'sheet', 'واجب': 'sheet',
+    'lecture': 'lecture', 'lectures': 'lecture', 'lec': 'lecture', 'lect': 'lecture',
+    'محاضرة': 'lecture', 'محاضره': 'lecture',
+    'section': 'section', 'sec': 'section', 'سكشن': 'section',
+    'chapter': 'chapter', 'ch': 'chapter', 'chap': 'chapter', 'باب': 'chapter', 'فصل': 'chapter',
+    'quiz': 'quiz', 'كويز': 'quiz',
+    'lab': 'lab', 'experiment': 'lab', 'معمل': 'lab',
+    'midterm': 'midterm', 'mid': 'midterm', 'ميدترم': 'midterm',
+    'final': 'final', 'فاينل': 'final',
+    'exam': 'exam', 'امتحان': 'exam',
+    'workshop': 'workshop',
+}
+
+# Tokens shared by more parents than this are too common to narrow a fuzzy lookup
+MAX_POSTING = 20
+FUZZY_THRESHOLD = 0.5
+
+
+def _normalize_token(token):
+    if len(token) > 3 and token.startswith(_ARABIC_ARTICLE) and not token.isascii():
+        token = token[len(_ARABIC_ARTICLE):]
+    return token
+
+
+def tokenize(name):
+    """Lowercased word and number tokens of a file name, without its extension."""
+    name = _EXTENSION_RE.sub('', name.strip()).lower().translate(_DIGITS)
+    return [_normalize_token(t) for t in _TOKEN_RE.findall(name)]
+
+
+def _solution_positions(tokens):
+    """Indexes of the tokens that mark a title as a solution."""
+    positions = set()
+    for i, token in enumerate(tokens):
+        if token in SOLUTION_TOKENS:
+            positions.add(i)
+        elif token in ABBREVIATED_SOLUTION_TOKENS:
+            before = tokens[i - 1] if i else None
+            after = tokens[i + 1] if i + 1 < len(tokens) else None
+            closes = after is None and before is not None and (before in KIND_TOKENS or before.isdigit())
+            if closes or after in KIND_TOKENS:
+                positions.add(i)
+    return positions
+
+
+def is_solution(name):
+    return bool(_solution_positions(tokenize(name)))
+
+
+@dataclass(frozen=True)
+class Title:
+    tokens: tuple
+    base: str        # title without solution words, e.g. "sheet 1"
+    kind: str        # 'sheet', 'lecture', ... or None
+    number: int      # sheet/lecture number (years are ignored) or None
+    numbers: tuple   # every non-year number, e.g. (5, 2) for "Sheet 5 Part 2"
+
+    @property
+    def key(self):
+        return (self.kind, self.number) if self.number is not None else None
+
+    @property
+    def words(self):
+        return set(self.tokens)
+
+
+def parse_title(name):
+    tokens = tokenize(name)
+    solution_at = _solution_positions(tokens)
+    tokens = [t for i, t in enumerate(tokens) if i not in solution_at]
+    kind = number = None
+    kind_at = None
+    for i, token in enumerate(tokens):
+        if token in KIND_TOKENS:
+            kind, kind_at = KIND_TOKENS[token], i
+            break
+    numbers = [(i, int(t)) for i, t in enumerate(tokens) if t.isdigit() and not _YEAR_RE.match(t) and len(t) <= 3]
+    if numbers:
+        # Prefer the number right after the kind word: "Sheet 3 (2023) v2" -> 3
+        after = [n for i, n in numbers if kind_at is not None and i > kind_at]
+        number = after[0] if after else numbers[0][1]
+    return Title(tuple(tokens), ' '.join(tokens), kind, number, tuple(n for _, n in numbers))
+
+
+def _similarity(a, b):
+    if a.number is not None and b.number is not None and a.number != b.number:
+        return 0.0
+    if a.kind and b.kind and a.kind != b.kind:
+        return 0.0
+    words_a, words_b = a.words, b.words
+    union = words_a | words_b
+    return len(words_a & words_b) / len(union) if union else 0.0
+
+
+class SolutionIndex:
+    """
+    Index of the non-solution files of one folder. add() each parent, then match() each solution;
+    a parent is handed out at most once, so a second "Sheet 1 Solution" stays standalone.
+    Buckets are dicts keyed by id(parent) so a taken parent is dropped from all of them in O(1).
+    """
+
+    def __init__(self):
+        self._by_base = {}
+        self._by_numbers = {}
+        self._by_key = {}
+        self._by_number = {}
+        self._by_token = {}
+        self._buckets_of = {}
+
+    def _put(self, index, key, entry):
+        bucket = index.setdefault(key, {})
+        bucket[id(entry[1])] = entry
+        self._buckets_of.setdefault(id(entry[1]), []).append(bucket)
+
+    def add(self, name, parent):
+        title = parse_title(name)
+        entry = (title, parent)
+        self._put(self._by_base, title.base, entry)
+        if title.key:
+            self._put(self._by_numbers, (title.kind, title.numbers), entry)
+            self._put(self._by_key, title.key, entry)
+            self._put(self._by_number, title.number, entry)
+        for token in title.words:
+            self._put(self._by_token, token, entry)
+
+    def _take(self, parent, how):
+        for bucket in self._buckets_of.pop(id(parent), ()):
+            bucket.pop(id(parent), None)
+        return parent, how
+
+    def _best(self, title, bucket):
+        # Rank a bounded number of candidates so one crowded bucket can't make matching quadratic
+        candidates = list(itertools.islice(bucket.values(), MAX_POSTING))
+        return max(candidates, key=lambda entry: _similarity(title, entry[0]))[1]
+
+    def match(self, name):
+        """Returns (parent, how) with how in 'exact', 'key', 'fuzzy', or (None, None)."""
+        title = parse_title(name)
+
+        exact = self._by_base.get(title.base)
+        if exact:
+            return self._take(next(reversed(exact.values()))[1], 'exact')
+
+        if title.key:
+            same_numbers = self._by_numbers.get((title.kind, title.numbers))
+            if same_numbers:
+                return self._take(self._best(title, same_numbers), 'key')
+            # "حل 3" has no kind word: accept a number match if only one parent has that number
+            candidates = self._by_key.get(title.key) if title.kind else self._by_number.get(title.number)
+            if candidates and (title.kind or len(candidates) == 1):
+                return self._take(self._best(title, candidates), 'key')
+
+        candidates = {}
+        for token in title.words:
+            posting = self._by_token.get(token, {})
+            if len(posting) <= MAX_POSTING:
+                candidates.update(posting)
+        scored = [(_similarity(title, entry[0]), entry[1]) for entry in candidates.values()]
+        if scored:
+            score, parent = max(scored, key=lambda pair: pair[0])
+            if score >= FUZZY_THRESHOLD:
+                return self._take(parent, 'fuzzy')
+        return None, None
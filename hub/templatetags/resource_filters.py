@@ -4,9 +4,22 @@ from hub.utils import get_subject_icon
 register = template.Library()
 
 @register.filter
-def count_by_category(resources, category):
-    """Count resources that match the given category"""
-    return resources.filter(category=category).count()
+def count_by_category(subject, category):
+    """
+    Number of a subject's resources in the given category, read from the `*_count` annotations that
+    with_resource_counts() puts on the queryset. Also accepts `subject.pdf_resources`.
+    Subjects loaded without annotations get all their counts from one grouped query, kept on the instance.
+    """
+    from hub.resource_stats import CATEGORY_FIELDS, category_counts
+    subject = getattr(subject, 'instance', subject)
+    field = CATEGORY_FIELDS.get(category)
+    if field is None:
+        return 0
+    if hasattr(subject, field):
+        return getattr(subject, field)
+    if not hasattr(subject, '_category_counts'):
+        subject._category_counts = category_counts(subject.pk)
+    return subject._category_counts.get(category, 0)
 
 @register.filter
 def filename(value):
@@ -1,3 +1,1066 @@
-from django.test import TestCase
+import json
+import re
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .chat_archive import archive_session, load_archived_messages
+from .chat_search import search_chat_history
+from . import drive_service, middleware
+from .drive_cache import cache_stats, expire_cache
+from .drive_crawler import crawl, map_level_files
+from .drive_fake import FakeDrive
+from .drive_import import import_drive_folder, plan_category_files
+from .drive_service import ListingStats, iter_files_in_folder, list_files_in_folder
+from .models import (
+    BroadcastNotification, BroadcastNotificationRead, ChatArchive, ChatSession, ChatMessage, ImportJob, Level,
+    Notification, Subject, SubjectResource, SubjectResourceStats,
+)
+from .jobs import claim_next_job, enqueue, run_job, work
+from .notifications import (
+    BROADCAST_VERSION_KEY, IMPORT_TITLE, broadcast_notification, collapse_import_notifications,
+    get_notification_summary, mark_all_read, prune_notifications,
+)
+from .page_cache import fragment_cache
+from .resource_stats import defer_stats_refresh, with_resource_counts
+from .solution_matching import SolutionIndex, is_solution, parse_title
+
+
+# The shared caches are database tables; query budgets count the app's own queries, so those tests
+# run on in-memory caches
+LOCMEM_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'template_fragments', 'chat_polls')
+}
+
+
+def assert_uses_index(testcase, queryset):
+    """
+    Runs EXPLAIN for a queryset and fails if the plan falls back to a sequential scan or an explicit sort.
+    Supports SQLite (EXPLAIN QUERY PLAN) and PostgreSQL; on Postgres seq scans are disabled for the
+    transaction so tiny test tables don't make the planner prefer them.
+    """
+    table = queryset.model._meta.db_table
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        testcase.assertNotIn('Seq Scan', plan, f'Sequential scan on {table}:\n{plan}')
+        testcase.assertNotRegex(plan, r'(?m)^\s*(->\s*)?Sort\b', f'Explicit sort on {table}:\n{plan}')
+    elif connection.vendor == 'sqlite':
+        plan = queryset.explain()
+        testcase.assertNotRegex(plan, rf'SCAN {re.escape(table)}(?! USING)', f'Full table scan on {table}:\n{plan}')
+        testcase.assertNotIn('USE TEMP B-TREE', plan, f'Explicit sort on {table}:\n{plan}')
+    else:
+        testcase.skipTest(f'No query plan check for {connection.vendor}')
+    return plan
+
+
+class ChatQueryPlanTests(TestCase):
+    """The chat polling endpoints run every few seconds per open tab, so their queries must stay on indexes."""
+
+    def setUp(self):
+        self.session = ChatSession.objects.create(guest_name='Guest')
+        ChatMessage.objects.create(session=self.session, sender='student', message='Hello')
+
+    def test_message_poll_uses_index(self):
+        assert_uses_index(self, ChatMessage.objects.filter(session=self.session, id__gt=0).order_by('id'))
+
+    def test_active_sessions_poll_uses_index(self):
+        assert_uses_index(self, ChatSession.objects.filter(is_active=True).order_by('-updated_at'))
+
+    def test_archived_sessions_poll_uses_index(self):
+        assert_uses_index(self, ChatSession.objects.filter(is_active=False).order_by('-updated_at')[:50])
+
+    def test_unread_count_uses_index(self):
+        assert_uses_index(self, self.session.messages.filter(sender='student', is_read=False))
+
+    def test_session_token_lookup_uses_index(self):
+        assert_uses_index(self, ChatSession.objects.filter(session_token=self.session.session_token))
+
+
+class ChatSearchTests(TestCase):
+
+    def setUp(self):
+        self.session = ChatSession.objects.create(guest_name='Mona', guest_email='mona@example.com')
+        ChatMessage.objects.create(session=self.session, sender='student', message='When is the registration deadline?')
+        ChatMessage.objects.create(session=self.session, sender='support', message='موعد التسجيل الأسبوع القادم')
+
+    def test_message_text_is_searchable(self):
+        page = search_chat_history('registration')['page']
+        self.assertEqual([m.message for m in page.object_list], ['When is the registration deadline?'])
+        self.assertEqual(search_chat_history('التسجيل')['page'].paginator.count, 1)
+
+    def test_index_follows_bulk_inserts_and_deletes(self):
+        ChatMessage.objects.bulk_create([ChatMessage(session=self.session, sender='support', message='Fees are due')])
+        self.assertEqual(search_chat_history('fees')['page'].paginator.count, 1)
+        ChatMessage.objects.filter(message='Fees are due').delete()
+        self.assertEqual(search_chat_history('fees')['page'].paginator.count, 0)
+
+    def test_search_is_read_only_and_migrate_repairs_dropped_triggers(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite FTS5 only')
+        from io import StringIO
+        from django.core.management import call_command
+        from .chat_search import SQLITE_TRIGGERS
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {SQLITE_TRIGGERS[0]}')
+        with CaptureQueriesContext(connection) as ctx:
+            search_chat_history('registration')
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'sqlite_master' in q['sql'] or 'CREATE' in q['sql']])
+
+        call_command('migrate', 'hub', verbosity=0)
+        ChatMessage.objects.create(session=self.session, sender='support', message='Fees are due')
+        self.assertEqual(search_chat_history('fees')['page'].paginator.count, 1)
+        out = StringIO()
+        call_command('rebuild_chat_search', '--if-missing', stdout=out)
+        self.assertIn('already complete', out.getvalue())
+
+    def test_guest_name_and_email_match_sessions(self):
+        self.assertEqual(search_chat_history('mona@')['sessions'], [self.session])
+
+
+class ChatEndpointTests(TestCase):
+
+    def test_polls_never_touch_the_database_cache(self):
+        session = ChatSession.objects.create(guest_name='Guest')
+        ChatMessage.objects.create(session=session, sender='student', message='Hello')
+        url = f"{reverse('hub:chat_get')}?session_id={session.session_token}&last_id=1"
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertFalse([q['sql'] for q in ctx.captured_queries if 'hub_cache' in q['sql']])
+
+    def test_missing_session_id_is_rejected_before_any_lookup(self):
+        admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.force_login(admin)
+        requests = [
+            lambda: self.client.get(reverse('hub:chat_get')),
+            lambda: self.client.post(reverse('hub:chat_send'), {'message': 'Hi'}),
+            lambda: self.client.post(reverse('hub:chat_end'), '{}', content_type='application/json'),
+            lambda: self.client.post(reverse('hub:chat_mark_read'), '{}', content_type='application/json'),
+        ]
+        for request in requests:
+            with CaptureQueriesContext(connection) as ctx:
+                response = request()
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse([q for q in ctx.captured_queries if 'hub_chatsession' in q['sql']])
+
+
+class ChatSidebarTests(TestCase):
+
+    def test_sidebar_query_count_does_not_grow_and_archive_is_capped(self):
+        from .views import ARCHIVED_SIDEBAR_LIMIT
+        admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.force_login(admin)
+        student = User.objects.create_user(username='student', password='pass')
+        for n in range(ARCHIVED_SIDEBAR_LIMIT + 5):
+            session = ChatSession.objects.create(user=student if n % 2 else None, guest_name=f'Guest {n}', is_active=n < 3)
+            ChatMessage.objects.create(session=session, sender='student', message='Hi')
+
+        for view, expected in (('', 3), ('archived', ARCHIVED_SIDEBAR_LIMIT)):
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(reverse('hub:chat_sessions'), {'view': view}).json()
+            self.assertEqual(len(data['sessions']), expected)
+            self.assertEqual({s['unread'] for s in data['sessions']}, {1})
+            # session, user, sessions with their users and unread counts
+            self.assertEqual(len(ctx.captured_queries), 3)
+
+        page = self.client.get(reverse('hub:admin_chat'), {'view': 'archived'})
+        self.assertEqual(len(page.context['sessions']), ARCHIVED_SIDEBAR_LIMIT)
+        self.assertNotContains(page, 'setInterval(fetchSessions')
+
+
+class ChatBroadcastTests(TestCase):
+
+    def setUp(self):
+        middleware.poll_cache().clear()
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.force_login(self.admin)
+        self.active = [ChatSession.objects.create(guest_name=f'Guest {n}') for n in range(3)]
+        self.ended = ChatSession.objects.create(guest_name='Ended', is_active=False)
+        ChatSession.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+    def broadcast(self, **payload):
+        return self.client.post(reverse('hub:chat_broadcast'), json.dumps(payload), content_type='application/json').json()
+
+    def test_broadcast_writes_one_message_per_active_session_and_invalidates_the_sidebar(self):
+        version = middleware.poll_cache().get(middleware._version_key(), 0)
+        self.assertEqual(self.broadcast(message=' Office closed today '), {'success': True, 'sent': 3})
+
+        messages = ChatMessage.objects.order_by('session_id')
+        self.assertEqual([(m.session_id, m.sender, m.message) for m in messages],
+                         [(s.id, 'support', 'Office closed today') for s in self.active])
+        touched = ChatSession.objects.filter(updated_at__gt=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(set(touched), set(self.active))
+        self.assertGreater(middleware.poll_cache().get(middleware._version_key(), 0), version)
+
+    @override_settings(CHAT_POLL_THROTTLE={'COALESCE_SECONDS': 30})
+    def test_broadcast_wakes_coalesced_message_polls(self):
+        url = reverse('hub:chat_get')
+        params = {'session_id': str(self.active[0].session_token), 'last_id': 0}
+        self.assertEqual(self.client.get(url, params).json()['messages'], [])
+        self.broadcast(message='Office closed today')
+        messages = self.client.get(url, params).json()['messages']
+        self.assertEqual([m['message'] for m in messages], ['Office closed today'])
+
+    def test_broadcast_to_chosen_sessions(self):
+        chosen = [str(self.active[0].session_token), str(self.ended.session_token)]
+        self.assertEqual(self.broadcast(message='Hi', session_ids=chosen), {'success': True, 'sent': 1})
+        self.assertEqual(list(ChatMessage.objects.values_list('session_id', flat=True)), [self.active[0].id])
+        self.assertEqual(self.broadcast(message='   '), {'success': False, 'error': 'Empty message'})
+
+
+class ChatArchiveTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.session = ChatSession.objects.create(guest_name='Guest', is_active=False)
+        for text in ('Hello', 'مرحبا'):
+            ChatMessage.objects.create(session=self.session, sender='student', message=text)
+        ChatSession.objects.filter(pk=self.session.pk).update(updated_at=timezone.now() - timedelta(days=60))
+
+    def test_archive_round_trip_appends_to_earlier_runs(self):
+        live = list(ChatMessage.objects.filter(session=self.session).order_by('id'))
+        self.assertEqual(archive_session(self.session), 2)
+        ChatMessage.objects.create(session=self.session, sender='support', message='Reply', file_url='https://example.com/a.pdf')
+        self.assertEqual(archive_session(self.session), 1)
+
+        self.assertFalse(ChatMessage.objects.filter(session=self.session).exists())
+        self.assertEqual(ChatArchive.objects.get(session=self.session).message_count, 3)
+        archived = load_archived_messages(self.session)
+        self.assertEqual([m['message'] for m in archived], ['Hello', 'مرحبا', 'Reply'])
+        self.assertEqual([(m['id'], m['created_at']) for m in archived[:2]], [(m.id, m.created_at) for m in live])
+        self.assertEqual(archived[2]['file_url'], 'https://example.com/a.pdf')
+
+    def test_command_archives_only_old_inactive_sessions(self):
+        from io import StringIO
+        from django.core.management import call_command
+        recent = ChatSession.objects.create(guest_name='Recent', is_active=False)
+        ChatMessage.objects.create(session=recent, sender='student', message='Still here')
+
+        call_command('archive_chats', '--days', '30', '--dry-run', stdout=StringIO())
+        self.assertEqual(ChatMessage.objects.count(), 3)
+        out = StringIO()
+        call_command('archive_chats', '--days', '30', stdout=out)
+        self.assertIn('Archived 2 messages from 1 sessions', out.getvalue())
+        self.assertEqual(list(ChatMessage.objects.values_list('message', flat=True)), ['Still here'])
+
+    def test_first_poll_restores_archived_history(self):
+        archive_session(self.session)
+        reply = ChatMessage.objects.create(session=self.session, sender='support', message='Back again')
+        url = reverse('hub:chat_get')
+
+        data = self.client.get(url, {'session_id': str(self.session.session_token), 'last_id': 0}).json()
+        self.assertEqual([m['message'] for m in data['messages']], ['Hello', 'مرحبا', 'Back again'])
+        data = self.client.get(url, {'session_id': str(self.session.session_token), 'last_id': reply.id - 1}).json()
+        self.assertEqual([m['message'] for m in data['messages']], ['Back again'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChatPollThrottleTests(TestCase):
+
+    def setUp(self):
+        middleware.poll_cache().clear()
+        middleware._backends.clear()
+        self.session = ChatSession.objects.create(guest_name='Guest')
+        ChatMessage.objects.create(session=self.session, sender='student', message='Hello')
+        self.url = f"{reverse('hub:chat_get')}?session_id={self.session.session_token}&last_id=0"
+
+    def test_token_bucket_refills_over_time(self):
+        from unittest import mock
+        backend = middleware.MemoryBucketBackend()
+        with mock.patch('hub.middleware.time.monotonic', return_value=100.0):
+            self.assertEqual([backend.consume('c', 1.0, 2) for _ in range(3)], [True, True, False])
+        with mock.patch('hub.middleware.time.monotonic', return_value=101.5):
+            self.assertEqual([backend.consume('c', 1.0, 2) for _ in range(2)], [True, False])
+        with mock.patch('hub.middleware.time.monotonic', return_value=200.0):
+            # Refill is capped at the bucket size
+            self.assertEqual([backend.consume('c', 1.0, 2) for _ in range(3)], [True, True, False])
+
+    @override_settings(CHAT_POLL_THROTTLE={'RATE': 1.0, 'BURST': 5, 'COALESCE_SECONDS': 30})
+    def test_identical_polls_are_coalesced_until_the_session_changes(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+
+        self.client.post(reverse('hub:chat_send'), {'session_id': str(self.session.session_token), 'message': 'Hi'})
+        third = self.client.get(self.url)
+        self.assertEqual(len(third.json()['messages']), 2)
+        self.assertEqual(middleware.get_backend().stats(), {'allowed': 2, 'coalesced': 1})
+
+    @override_settings(CHAT_POLL_THROTTLE={'RATE': 0.5, 'BURST': 2, 'COALESCE_SECONDS': 0})
+    def test_polls_over_the_burst_get_429_with_retry_after(self):
+        codes = [self.client.get(self.url).status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+
+        admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.force_login(admin)
+        stats = self.client.get(reverse('hub:chat_throttle_stats')).json()
+        self.assertEqual((stats['backend'], stats['stats']), ('memory', {'allowed': 2, 'throttled': 2}))
+
+
+class NotificationSummaryCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.level = Level.objects.create(level_id='100', title='Level 100', icon_name='fa-cog')
+        self.user = User.objects.create_user(username='student', password='pass')
+        self.user.profile.level = self.level
+        self.user.profile.save()
+        Notification.objects.create(user=self.user, title='Welcome')
+        self.client.force_login(self.user)
+
+    def notification_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('hub:about'))
+        return [q['sql'] for q in ctx.captured_queries if 'notification' in q['sql']]
+
+    def test_cache_hit_runs_no_notification_queries(self):
+        self.assertTrue(self.notification_queries())
+        self.assertEqual(self.notification_queries(), [])
+
+    def test_new_notifications_and_reads_invalidate_summary(self):
+        self.notification_queries()
+        broadcast_notification('New Resource Uploaded', 'Lecture 1', level=self.level)
+        self.assertEqual(get_notification_summary(self.user)['unread_count'], 2)
+        mark_all_read(self.user)
+        self.assertEqual(get_notification_summary(self.user)['unread_count'], 0)
+        Notification.objects.create(user=self.user, title='Reply')
+        self.assertEqual(get_notification_summary(self.user)['unread_count'], 1)
+
+
+class NotificationRetentionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.level = Level.objects.create(level_id='100', title='Level 100', icon_name='fa-cog')
+        self.students = []
+        for name in ('amr', 'mona'):
+            user = User.objects.create_user(username=name, password='pass')
+            user.profile.level = self.level
+            user.profile.save()
+            self.students.append(user)
+        self.old = timezone.now() - timedelta(days=200)
+        User.objects.update(date_joined=self.old - timedelta(days=1))
+
+    def age(self, *objs):
+        type(objs[0]).objects.filter(pk__in=[obj.pk for obj in objs]).update(created_at=self.old)
+
+    def test_prune_keeps_unread_rows_and_invalidates_once(self):
+        amr, mona = self.students
+        read = Notification.objects.create(user=amr, title='Old', is_read=True)
+        unread = Notification.objects.create(user=amr, title='Old unread')
+        seen = broadcast_notification(IMPORT_TITLE, 'Seen by all', level=self.level)
+        half_seen = broadcast_notification(IMPORT_TITLE, 'Seen by one', level=self.level)
+        also_seen = broadcast_notification(IMPORT_TITLE, 'Also seen by all', level=self.level)
+        mark_all_read(mona)
+        mark_all_read(amr)
+        Notification.objects.filter(pk=unread.pk).update(is_read=False)
+        BroadcastNotificationRead.objects.filter(user=amr, broadcast=half_seen).delete()
+        self.age(read, unread)
+        self.age(seen, half_seen, also_seen)
+        cache.set(BROADCAST_VERSION_KEY, 1)
+
+        self.assertEqual(prune_notifications(120), (1, 2))
+        self.assertEqual(list(Notification.objects.all()), [unread])
+        self.assertEqual(list(BroadcastNotification.objects.all()), [half_seen])
+        # One batch of broadcast deletes bumps the version once, not once per row
+        self.assertEqual(cache.get(BROADCAST_VERSION_KEY), 2)
+
+    def test_collapse_folds_into_earlier_summaries(self):
+        messages = [
+            '3 new Lectures files have been added for Dynamics.',
+            '2 new Sheets files have been added for Dynamics.',
+            '10 new files have been added across 4 Level 100 folders.',
+            '5 new files have been added across 2 Level 100 folders.',
+        ]
+        for message in messages:
+            broadcast_notification(IMPORT_TITLE, message, level=self.level)
+        self.assertEqual(collapse_import_notifications(), 2)
+        self.assertEqual(sorted(BroadcastNotification.objects.values_list('message', flat=True)), [
+            '15 new files have been added across Level 100 folders in 2 imports.',
+            '5 new files have been added for Dynamics across 2 imports.',
+        ])
+
+        broadcast_notification(IMPORT_TITLE, '1 new Final files have been added for Dynamics.', level=self.level)
+        broadcast_notification(IMPORT_TITLE, '4 new files have been added across 1 Level 100 folders.', level=self.level)
+        self.assertEqual(collapse_import_notifications(), 2)
+        self.assertEqual(sorted(BroadcastNotification.objects.values_list('message', flat=True)), [
+            '19 new files have been added across Level 100 folders in 3 imports.',
+            '6 new files have been added for Dynamics across 3 imports.',
+        ])
+
+
+class SubjectResourceStatsTests(TestCase):
+
+    def setUp(self):
+        level = Level.objects.create(level_id='200', title='Level 200', icon_name='fa-cog')
+        self.subject = Subject.objects.create(name='Control Systems', level=level, semester=1)
+
+    def stats(self):
+        return SubjectResourceStats.objects.get(subject=self.subject)
+
+    def test_signals_keep_counts_current(self):
+        lecture = SubjectResource.objects.create(subject=self.subject, category='Lectures')
+        SubjectResource.objects.create(subject=self.subject, category='Sheets')
+        self.assertEqual((self.stats().lectures_count, self.stats().sheets_count, self.stats().total_count), (1, 1, 2))
+        lecture.delete()
+        self.assertEqual((self.stats().lectures_count, self.stats().total_count), (0, 1))
+
+    def test_deferred_block_refreshes_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with defer_stats_refresh():
+                for i in range(5):
+                    SubjectResource.objects.create(subject=self.subject, category='Final')
+        stats_writes = [q for q in ctx.captured_queries if 'hub_subjectresourcestats' in q['sql']]
+        self.assertEqual(len(stats_writes), 1)
+        self.assertEqual(self.stats().final_count, 5)
+
+    def test_subject_delete_cascades_cleanly(self):
+        SubjectResource.objects.create(subject=self.subject, category='Lectures')
+        self.subject.level.delete()
+        self.assertFalse(SubjectResourceStats.objects.exists())
+
+    def test_moving_a_resource_refreshes_both_subjects(self):
+        from .page_cache import page_version
+        other = Subject.objects.create(name='Dynamics', level=self.subject.level, semester=1)
+        resource = SubjectResource.objects.create(subject=self.subject, category='Lectures')
+        version = page_version('subject', self.subject.pk)
+        resource.subject = other
+        resource.save()
+        counts = dict(SubjectResourceStats.objects.values_list('subject__name', 'lectures_count'))
+        self.assertEqual(counts, {'Control Systems': 0, 'Dynamics': 1})
+        self.assertNotEqual(page_version('subject', self.subject.pk), version)
+
+    def test_rebuild_command_repairs_counts_after_bulk_writes(self):
+        from io import StringIO
+        from django.core.management import call_command
+        SubjectResource.objects.bulk_create([SubjectResource(subject=self.subject, category='Sheets') for _ in range(2)])
+        call_command('rebuild_resource_stats', stdout=StringIO())
+        self.assertEqual(SubjectResourceStats.objects.get(subject=self.subject).sheets_count, 2)
+
+    def test_queryset_delete_cascades_cleanly(self):
+        SubjectResource.objects.create(subject=self.subject, category='Lectures')
+        Subject.objects.filter(pk=self.subject.pk).delete()
+        self.assertFalse(SubjectResourceStats.objects.exists())
+        Level.objects.all().delete()
+
+    def test_deferred_refresh_skips_deleted_subjects(self):
+        with defer_stats_refresh():
+            SubjectResource.objects.create(subject=self.subject, category='Lectures')
+            self.subject.delete()
+        self.assertFalse(SubjectResourceStats.objects.exists())
+
+    def test_annotation_defaults_to_zero_without_stats_row(self):
+        subject = with_resource_counts(Subject.objects.filter(pk=self.subject.pk)).get()
+        self.assertEqual((subject.lectures_count, subject.file_count), (0, 0))
+
+
+class LevelsPageQueryTests(TestCase):
+
+    def add_level(self, n):
+        level = Level.objects.create(level_id=f'{n}00', title=f'Level {n}00', icon_name='fa-cog')
+        for i in range(4):
+            subject = Subject.objects.create(name=f'Subject {n}.{i}', level=level, semester=1 + i % 2)
+            SubjectResource.objects.create(subject=subject, category='Lectures')
+
+    def page_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('hub:levels'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_levels(self):
+        self.add_level(1)
+        _, few = self.page_queries()
+        for n in range(2, 7):
+            self.add_level(n)
+        response, many = self.page_queries()
+        self.assertEqual(few, many)
+        level = response.context['levels'][0]
+        self.assertEqual([s.name for s in level.preview_subjects], ['Subject 1.0', 'Subject 1.1', 'Subject 1.2'])
+        self.assertEqual((level.course_count, level.lecture_count, level.preview_subjects[0].file_count), (4, 4, 1))
+
+
+class LevelDetailCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.level = Level.objects.create(level_id='300', title='Level 300', icon_name='fa-cog')
+        self.s1 = Subject.objects.create(name='Dynamics', level=self.level, semester=1)
+        self.s2 = Subject.objects.create(name='Robotics', level=self.level, semester=2)
+        self.url = reverse('hub:level_detail', args=[self.level.level_id])
+
+    def get(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        subject_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "hub_subject"' in q['sql']]
+        return response, subject_queries
+
+    def test_subjects_split_by_semester_from_one_query(self):
+        response, queries = self.get()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([s.name for s in response.context['subjects_s1']], ['Dynamics'])
+        self.assertEqual([s.name for s in response.context['subjects_s2']], ['Robotics'])
+        self.assertEqual(self.get()[1], [])
+
+    def test_resource_and_subject_changes_invalidate(self):
+        self.get()
+        SubjectResource.objects.create(subject=self.s1, category='Sheets')
+        response, queries = self.get()
+        self.assertTrue(queries)
+        self.assertEqual(response.context['subjects_s1'][0].sheets_count, 1)
+
+        other = Level.objects.create(level_id='400', title='Level 400', icon_name='fa-cog')
+        self.s2.level = other
+        self.s2.save()
+        self.assertEqual(self.get()[0].context['subjects_s2'], [])
+
+
+class SubjectCountRenderingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.level = Level.objects.create(level_id='500', title='Level 500', icon_name='fa-cog')
+        self.user = User.objects.create_user(username='student', password='pass')
+        self.user.profile.level = self.level
+        self.user.profile.save()
+
+    def add_subjects(self, n):
+        start = Subject.objects.count()
+        with defer_stats_refresh():
+            for i in range(start, start + n):
+                subject = Subject.objects.create(name=f'Subject {i:02d}', level=self.level, semester=1 + i % 2)
+                SubjectResource.objects.create(subject=subject, category='Lectures')
+                SubjectResource.objects.create(subject=subject, category='Sheets')
+        self.user.profile.registered_subjects.set(Subject.objects.all())
+
+    def dashboard_queries(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('hub:student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_dashboard_with_40_subjects_matches_single_subject_query_count(self):
+        self.add_subjects(1)
+        _, single = self.dashboard_queries()
+        self.add_subjects(39)
+        response, forty = self.dashboard_queries()
+        self.assertEqual(len(response.context['subjects_s1']) + len(response.context['subjects_s2']), 40)
+        self.assertEqual(single, forty)
+
+    def test_count_filter_matches_annotations(self):
+        from .templatetags.resource_filters import count_by_category
+        self.add_subjects(1)
+        annotated = with_resource_counts(Subject.objects.all()).get()
+        plain = Subject.objects.get()
+        for category in ['Lectures', 'Sheets', 'Final', 'Unknown']:
+            self.assertEqual(count_by_category(annotated, category), count_by_category(plain.pdf_resources, category))
+        self.assertEqual(count_by_category(annotated, 'Lectures'), 1)
+
+    def level_detail_queries(self):
+        cache.clear()
+        fragment_cache().clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('hub:level_detail', args=[self.level.level_id]))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_level_detail_subject_cards_with_40_subjects_match_single_subject(self):
+        self.add_subjects(1)
+        _, single = self.level_detail_queries()
+        self.add_subjects(39)
+        response, forty = self.level_detail_queries()
+        self.assertContains(response, 'Subject 39')
+        self.assertEqual(single, forty)
+
+    def test_unannotated_subject_cards_count_with_one_query_per_subject(self):
+        from django.template.loader import render_to_string
+        self.add_subjects(3)
+        categories = [t[0] for t in SubjectResource.RESOURCE_TYPES]
+        subjects = list(Subject.objects.select_related('level'))
+        with CaptureQueriesContext(connection) as ctx:
+            html = ''.join(
+                render_to_string('partials/subject_card.html', {'subject': s, 'categories': categories})
+                for s in subjects
+            )
+        count_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "hub_subjectresource"' in q['sql']]
+        self.assertEqual(len(count_queries), len(subjects))
+        self.assertIn('(1)', html)
+
+
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        fragment_cache().clear()
+        self.level = Level.objects.create(level_id='600', title='Level 600', icon_name='fa-cog')
+        self.subject = Subject.objects.create(name='Thermodynamics', level=self.level, semester=1)
+
+    def queries_for(self, url, table):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in ctx.captured_queries if f'FROM "{table}"' in q['sql']]
+
+    def test_static_page_key_follows_template_mtime(self):
+        import os
+        from .page_cache import static_page_key
+        from django.template.loader import get_template
+        key = static_page_key('hub/tools.html')
+        path = get_template('hub/tools.html').origin.name
+        stat = os.stat(path)
+        try:
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            self.assertNotEqual(static_page_key('hub/tools.html'), key)
+        finally:
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertContains(self.client.get(reverse('hub:tools')), 'Drawing Tools')
+
+    def test_level_page_fragment_skips_subject_query_until_a_resource_changes(self):
+        url = reverse('hub:level_detail', args=[self.level.level_id])
+        self.queries_for(url, 'hub_subject')
+        cache.clear()  # drop the subject list cache too, so only the fragment can serve the page
+        response, queries = self.queries_for(url, 'hub_subject')
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Thermodynamics')
+
+        SubjectResource.objects.create(subject=self.subject, category='Lectures')
+        self.assertTrue(self.queries_for(url, 'hub_subject')[1])
+
+    def test_subject_page_resource_list_is_cached_per_version(self):
+        url = reverse('hub:resource_detail', args=[self.subject.pk, 'Lectures'])
+        SubjectResource.objects.create(subject=self.subject, category='Lectures', title='Lecture 1')
+        self.queries_for(url, 'hub_subjectresource')
+        response, queries = self.queries_for(url, 'hub_subjectresource')
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Lecture 1')
+
+        SubjectResource.objects.create(subject=self.subject, category='Lectures', title='Lecture 2')
+        self.assertContains(self.client.get(url), 'Lecture 2')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StudentDashboardQueryBudgetTests(TestCase):
+    # session, user, profile+level, semester, subjects, recent uploads, plus the navbar's
+    # unread count and feed on a cold notification cache
+    QUERY_BUDGET = 8
+
+    def setUp(self):
+        cache.clear()
+        level = Level.objects.create(level_id='700', title='Level 700', icon_name='fa-cog')
+        with defer_stats_refresh():
+            for i in range(12):
+                subject = Subject.objects.create(name=f'Subject {i:02d}', level=level, semester=1 + i % 2)
+                SubjectResource.objects.create(subject=subject, category='Lectures', title=f'Lecture {i}')
+        self.user = User.objects.create_user(username='student', password='pass')
+        self.user.profile.level = level
+        self.user.profile.save()
+        self.client.force_login(self.user)
+
+    def test_dashboard_stays_within_query_budget(self):
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('hub:student_dashboard'))
+        self.assertEqual(len(response.context['subjects_s1']), 6)
+        self.assertEqual(len(response.context['subjects_s2']), 6)
+        self.assertEqual(len(response.context['recent_uploads']), 3)
+        self.assertEqual(response.context['current_semester'], 1)
+
+    def test_dashboard_without_level(self):
+        self.user.profile.level = None
+        self.user.profile.save()
+        self.user.profile.registered_subjects.clear()
+        response = self.client.get(reverse('hub:student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['recent_uploads'], [])
+
+
+class ImportJobQueueTests(TestCase):
+
+    def setUp(self):
+        level = Level.objects.create(level_id='800', title='Level 800', icon_name='fa-cog')
+        self.subject = Subject.objects.create(name='Mechanics', level=level, semester=1)
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+
+    def test_dashboard_queues_import_and_worker_runs_it(self):
+        from unittest import mock
+        self.client.force_login(self.admin)
+        self.client.post(reverse('hub:admin_dashboard'), {
+            'drive_import': 'true', 'folder_url': 'https://drive.google.com/drive/folders/abc',
+            'subject_id': self.subject.pk, 'category': 'Sheets',
+        })
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, 'queued')
+        self.assertFalse(SubjectResource.objects.exists())
+
+        files = [{'id': 'f1', 'name': 'Sheet 1.pdf'}, {'id': 'f2', 'name': 'Sheet 1 Solution.pdf'}]
+        with mock.patch('hub.drive_service.list_files_in_folder', return_value=files):
+            self.assertEqual(work('test', once=True), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result['added'], job.processed, job.total), ('done', 1, 2, 2))
+        sheet = SubjectResource.objects.get()
+        self.assertEqual(sheet.solution_file_id, 'f2')
+        status = self.client.get(reverse('hub:import_job_status', args=[job.pk])).json()
+        self.assertTrue(status['done'])
+
+    def test_fan_out_runs_on_the_worker_in_batches(self):
+        from .notifications import enqueue_fan_out, fan_out
+        User.objects.bulk_create([User(username=f'staff{n}', is_staff=True) for n in range(4)])
+        job = enqueue_fan_out('staff', 'New Student Registered', 'Student mona has created an account.')
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(work('test', once=True), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.processed, job.total), ('done', {'sent': 5}, 5, 5))
+        self.assertEqual(Notification.objects.filter(user__is_staff=True).count(), 5)
+
+        reports = []
+        sent = fan_out(User.objects.filter(is_staff=True), 'T', 'M', batch_size=2, progress=lambda *args: reports.append(args[:2]))
+        self.assertEqual((sent, reports), (5, [(2, 5), (4, 5), (5, 5)]))
+
+    def test_failures_are_recorded_and_claims_are_exclusive(self):
+        job = enqueue('drive_folder_import', {'folder_url': 'not a url', 'subject_id': self.subject.pk, 'category': 'Sheets'})
+        claimed = claim_next_job('w1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(claim_next_job('w2'))
+        with self.assertLogs('hub.jobs', level='ERROR'):
+            self.assertFalse(run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Invalid Google Drive Folder URL', job.error)
+
+
+class DriveListingTests(TestCase):
+
+    def setUp(self):
+        self.drive = FakeDrive()
+        self.folder = self.drive.add_folder('root', 'Sheets')
+        self.drive.add_folder(self.folder, 'Old')
+        for i in range(25):
+            self.drive.add_file(self.folder, f'Sheet {i}.pdf')
+
+    def test_follows_next_page_token_and_skips_folders(self):
+        stats = ListingStats()
+        files = list_files_in_folder(self.folder, page_size=10, service=self.drive.service(), stats=stats)
+        self.assertEqual(len(files), 25)
+        self.assertEqual(stats.calls, 3)
+        self.assertEqual(stats.files, 25)
+        self.assertEqual([c['pageToken'] for c in self.drive.calls], [None, '10', '20'])
+
+    def test_requests_only_the_fields_the_importer_uses(self):
+        files = list_files_in_folder(f'https://drive.google.com/drive/folders/{self.folder}', service=self.drive.service())
+        self.assertEqual(set(files[0]), {'id', 'name'})
+        self.assertEqual(self.drive.calls[0]['fields'], 'nextPageToken, files(id, name)')
+
+    def test_generator_is_lazy(self):
+        files = iter_files_in_folder(self.folder, page_size=10, service=self.drive.service())
+        next(files)
+        self.assertEqual(len(self.drive.calls), 1)
+
+
+class DriveCrawlerTests(TestCase):
+
+    def setUp(self):
+        self.level = Level.objects.create(level_id='000', title='Level 000', icon_name='fa-cog')
+        self.mechanics = Subject.objects.create(name='Mechanics', level=self.level, semester=1)
+        self.drive = FakeDrive()
+        term = self.drive.add_folder('root', 'Level 000 First Term')
+        subject = self.drive.add_folder(term, 'Mechanice')
+        self.sheets = self.drive.add_folder(subject, 'Sheet')
+        self.drive.add_file(self.sheets, 'Sheet 1.pdf', file_id='s1')
+        self.drive.add_file(self.sheets, 'Sheet 1 Solution.pdf', file_id='s1-sol')
+        self.drive.add_file(self.drive.add_folder(subject, 'Lectures'), 'Lecture 1.pdf', file_id='l1')
+        self.drive.add_file(self.drive.add_folder(subject, 'Misc'), 'notes.pdf')
+        self.drive.add_file(self.drive.add_folder(term, 'Unknown Subject'), 'x.pdf')
+
+    def test_crawl_maps_folders_with_the_import_resources_tables(self):
+        entries, stats = crawl('root', max_workers=4, service=self.drive.service())
+        self.assertEqual(stats.files, 5)
+        self.assertEqual(stats.folders, 7)
+        groups, unmatched = map_level_files(self.level, entries)
+        self.assertEqual(
+            {(s.name, c): sorted(f['id'] for f in files) for (s, c), files in groups.items()},
+            {('Mechanics', 'Sheets'): ['s1', 's1-sol'], ('Mechanics', 'Lectures'): ['l1']},
+        )
+        self.assertEqual(len(unmatched), 2)
+        self.assertEqual(groups[(self.mechanics, 'Sheets')][0]['folder_id'], self.sheets)
+
+    def test_level_job_imports_every_category(self):
+        from unittest import mock
+        job = enqueue('drive_level_import', {'root_url': 'https://drive.google.com/drive/folders/root', 'level_id': self.level.pk})
+        with mock.patch('hub.drive_crawler.get_drive_service', return_value=self.drive.service()):
+            run_job(claim_next_job('test'))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result['added'], job.result['unmatched']), ('done', 2, 2))
+        sheet = SubjectResource.objects.get(category='Sheets')
+        self.assertEqual(sheet.solution_file_id, 's1-sol')
+        self.assertEqual(sheet.drive_folder_url, f'https://drive.google.com/drive/folders/{self.sheets}')
+        self.assertEqual(self.mechanics.resource_stats.total_count, 2)
+
+
+@override_settings(DRIVE_CACHE_TTL=0, CACHES=LOCMEM_CACHES)
+class DriveSyncTests(TestCase):
+
+    def setUp(self):
+        from unittest import mock
+        level = Level.objects.create(level_id='700', title='Level 700', icon_name='fa-cog')
+        self.subject = Subject.objects.create(name='Dynamics', level=level, semester=1)
+        self.drive = FakeDrive()
+        self.folder = self.drive.add_folder('root', 'Sheets')
+        self.drive.add_file(self.folder, 'Sheet 1.pdf', file_id='s1')
+        self.drive.add_file(self.folder, 'Sheet 1 Solution.pdf', file_id='s1-sol')
+        self.drive.add_file(self.folder, 'Sheet 2.pdf', file_id='s2')
+        patcher = mock.patch('hub.drive_service.get_drive_service', return_value=self.drive.service())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sync(self):
+        return import_drive_folder(f'https://drive.google.com/drive/folders/{self.folder}', self.subject.pk, 'Sheets')
+
+    def test_unchanged_folder_is_one_list_call_and_no_writes(self):
+        self.assertEqual(self.sync()['added'], 2)
+        calls = len(self.drive.calls)
+        with CaptureQueriesContext(connection) as ctx:
+            result = self.sync()
+        self.assertTrue(result['skipped'])
+        self.assertEqual(len(self.drive.calls), calls + 1)
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+        self.assertEqual(writes, [])
+
+    def test_diff_keeps_unchanged_rows_and_manual_uploads(self):
+        self.sync()
+        manual = SubjectResource.objects.create(subject=self.subject, category='Sheets', title='Scan', preview_url='https://example.com/x')
+        sheet1 = SubjectResource.objects.get(file_id='s1')
+
+        files = self.drive.children[self.folder]
+        files[:] = [f for f in files if f['id'] != 's2']
+        files[0].update(name='Sheet 1 (v2).pdf', modifiedTime='2026-02-01T00:00:00.000Z')
+        self.drive.add_file(self.folder, 'Sheet 3.pdf', file_id='s3')
+
+        result = self.sync()
+        self.assertEqual((result['added'], result['updated'], result['deleted']), (1, 1, 1))
+        sheet1.refresh_from_db()
+        self.assertEqual(sheet1.title, 'Sheet 1 (v2)')
+        self.assertEqual(sheet1.solution_file_id, 's1-sol')
+        self.assertTrue(SubjectResource.objects.filter(pk=manual.pk).exists())
+        self.assertEqual(
+            sorted(SubjectResource.objects.exclude(file_id=None).values_list('file_id', flat=True)),
+            ['s1', 's3'],
+        )
+        self.assertEqual(self.subject.resource_stats.sheets_count, 3)
+
+
+    def test_large_folder_imports_in_a_handful_of_queries(self):
+        for i in range(3, 253):
+            self.drive.add_file(self.folder, f'Sheet {i}.pdf')
+            self.drive.add_file(self.folder, f'Sheet {i} Solution.pdf')
+        with CaptureQueriesContext(connection) as ctx:
+            result = self.sync()
+        self.assertEqual(result['added'], 252)
+        self.assertEqual(SubjectResource.objects.exclude(solution_file_id=None).count(), 251)
+        # Bulk statements only (SQLite splits the insert to stay under its variable limit)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "hub_subjectresource"')]
+        self.assertLessEqual(len(inserts), 3)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "hub_subjectresource"')])
+        self.assertLess(len(ctx.captured_queries), 20)
+
+class SolutionMatchingTests(TestCase):
+
+    def match_all(self, names):
+        index = SolutionIndex()
+        for name in names:
+            if not is_solution(name):
+                index.add(name, name)
+        return {name: index.match(name) for name in names if is_solution(name)}
+
+    def test_extra_tokens_still_match_by_kind_and_number(self):
+        links = self.match_all(['Sheet 1.pdf', 'Sheet 2.pdf', 'Sheet 1 - Solution 2023.pdf', 'Solution of sheet 2.pdf'])
+        self.assertEqual(links['Sheet 1 - Solution 2023.pdf'], ('Sheet 1.pdf', 'key'))
+        self.assertEqual(links['Solution of sheet 2.pdf'], ('Sheet 2.pdf', 'key'))
+        self.assertEqual(parse_title('Sheet 3 (2023) v2.pdf').key, ('sheet', 3))
+
+    def test_arabic_solution_names(self):
+        self.assertTrue(is_solution('حل شيت 1.pdf'))
+        self.assertTrue(is_solution('الحل_3.pdf'))
+        # "حل" inside another word is not a solution marker
+        self.assertFalse(is_solution('المرحلة الأولى.pdf'))
+        self.assertFalse(is_solution('Modeling of Systems.pdf'))
+
+        links = self.match_all(['شيت 1.pdf', 'شيت 2.pdf', 'محاضرة 3.pdf', 'حل شيت 1.pdf', 'حل الشيت ٢.pdf', 'حل محاضرة 3.pdf'])
+        self.assertEqual(links['حل شيت 1.pdf'][0], 'شيت 1.pdf')
+        self.assertEqual(links['حل الشيت ٢.pdf'][0], 'شيت 2.pdf')
+        self.assertEqual(links['حل محاضرة 3.pdf'][0], 'محاضرة 3.pdf')
+
+    def test_each_parent_is_linked_once_and_unknown_numbers_stay_standalone(self):
+        links = self.match_all(['Sheet 1.pdf', 'Sheet 1 Solution.pdf', 'Sheet 1 Solution (scan).pdf', 'Sheet 5 Solution.pdf'])
+        self.assertEqual(links['Sheet 1 Solution.pdf'], ('Sheet 1.pdf', 'exact'))
+        self.assertEqual(links['Sheet 1 Solution (scan).pdf'], (None, None))
+        self.assertEqual(links['Sheet 5 Solution.pdf'], (None, None))
+
+    def test_title_words_that_look_like_abbreviations_are_not_solutions(self):
+        for name in ('Lecture 3 Key Concepts.pdf', 'Lecture 2 - Mathematical Model.pdf', 'Model Exam 2023.pdf', 'نموذج امتحان.pdf'):
+            self.assertFalse(is_solution(name), name)
+        self.assertTrue(is_solution('Sheet 4 Key.pdf'))
+        self.assertTrue(is_solution('Ans Sheet 5.pdf'))
+        self.assertTrue(is_solution('Midterm 2023 Model Answer.pdf'))
+
+        planned = plan_category_files([
+            {'id': 'a', 'name': 'Lecture 3.pdf'}, {'id': 'b', 'name': 'Lecture 3 Key Concepts.pdf'},
+            {'id': 'c', 'name': 'Lecture 2.pdf'}, {'id': 'd', 'name': 'Lecture 2 - Mathematical Model.pdf'},
+        ], 'https://drive.google.com/drive/folders/f')
+        self.assertEqual(sorted(planned), ['a', 'b', 'c', 'd'])
+        self.assertFalse([row for row in planned.values() if row['solution_url']])
+
+    def test_fuzzy_fallback_for_titles_without_numbers(self):
+        links = self.match_all(['Thermodynamics Steam Tables.pdf', 'Final 2023.pdf', 'Thermodynamics Tables answers.pdf', 'Final 2021 Solution.pdf'])
+        self.assertEqual(links['Thermodynamics Tables answers.pdf'], ('Thermodynamics Steam Tables.pdf', 'fuzzy'))
+        self.assertEqual(links['Final 2021 Solution.pdf'], (None, None))
+
+
+@override_settings(DRIVE_CACHE_TTL=600)
+class DriveMetadataCacheTests(TestCase):
+
+    def setUp(self):
+        self.drive = FakeDrive()
+        self.folder = self.drive.add_folder('root', 'Sheets')
+        for i in range(25):
+            self.drive.add_file(self.folder, f'Sheet {i}.pdf')
+
+    def list(self, **kwargs):
+        stats = ListingStats()
+        files = list_files_in_folder(self.folder, page_size=10, service=self.drive.service(), stats=stats, **kwargs)
+        return files, stats
+
+    def test_repeat_listing_is_served_from_the_cache(self):
+        first, _ = self.list()
+        second, stats = self.list()
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.drive.calls), 3)
+        self.assertEqual((stats.calls, stats.cache_hits), (0, 1))
+        self.assertEqual(cache_stats()['saved_calls'], 3)
+        self.assertEqual(cache_stats()['hit_rate'], 50)
+
+    def test_refresh_and_expiry_go_back_to_drive(self):
+        self.list()
+        self.drive.add_file(self.folder, 'Sheet 25.pdf')
+        self.assertEqual(len(self.list(refresh=True)[0]), 26)
+        self.drive.add_file(self.folder, 'Sheet 26.pdf')
+        self.assertEqual(len(self.list()[0]), 26)
+        expire_cache()
+        self.assertEqual(len(self.list()[0]), 27)
+        self.assertEqual(cache_stats()['fetches'], 3)
+
+    def test_crawler_uses_the_cache_and_dashboard_shows_stats(self):
+        self.drive.add_file(self.drive.add_folder(self.folder, 'Old'), 'Old sheet.pdf')
+        crawl('root', max_workers=2, service=self.drive.service())
+        calls = len(self.drive.calls)
+        entries, stats = crawl('root', max_workers=2, service=self.drive.service())
+        self.assertEqual(len(self.drive.calls), calls)
+        self.assertEqual((len(entries), stats.listing.cache_hits), (26, 3))
+
+        admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.force_login(admin)
+        self.assertContains(self.client.get(reverse('hub:admin_dashboard')), 'API calls saved')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TextImportTests(TestCase):
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        level = Level.objects.create(level_id='600', title='Level 600', icon_name='fa-cog')
+        self.subject = Subject.objects.create(name='Fluid Mechanics', level=level, semester=1)
+        SubjectResource.objects.create(
+            subject=self.subject, category='Sheets', title='Sheet 1',
+            download_url='https://drive.google.com/uc?id=s1&export=download',
+        )
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        lines = ['[LECTURES]'] + [f'Lecture {i} | https://drive.google.com/file/d/l{i}/view' for i in range(20)]
+        lines += ['[SHEETS]', 'Sheet 1 | https://drive.google.com/file/d/s1/view', 'https://drive.google.com/file/d/s2/view',
+                  'https://drive.google.com/file/d/s2/view', 'not a link']
+        with open(f'{self.dir}/Fluid_Mechanics.txt', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        with open(f'{self.dir}/Unknown_Subject.txt', 'w', encoding='utf-8') as f:
+            f.write('[SHEETS]\nhttps://drive.google.com/file/d/x/view')
+
+    def test_skips_known_and_repeated_links_with_batched_inserts(self):
+        from contextlib import redirect_stdout
+        from io import StringIO
+        import import_all_resources
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx, redirect_stdout(out):
+            added = import_all_resources.import_resources(self.dir, batch_size=8, workers=1)
+        self.assertEqual(added, 21)
+        self.assertEqual(SubjectResource.objects.filter(subject=self.subject).count(), 22)
+        self.assertEqual(SubjectResource.objects.get(download_url__contains='id=s2&').title, 'Sheets Resource')
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "hub_subjectresource"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertLess(len(ctx.captured_queries), 15)
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertEqual(self.subject.resource_stats.total_count, 22)
+        self.assertIn('Fluid Mechanics: +21 added, 2 skipped, 1 unmatched', out.getvalue())
+
+    def test_dry_run_reports_without_writing(self):
+        from contextlib import redirect_stdout
+        from io import StringIO
+        import import_all_resources
+
+        with open(f'{self.dir}/fluid_mechanics.txt', 'w', encoding='utf-8') as f:
+            f.write('[FINAL]\nFinal 2023 | https://drive.google.com/file/d/f1/view\n[UNKNOWN]\nhttps://x')
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx, redirect_stdout(out):
+            added = import_all_resources.import_resources(self.dir, workers=2, dry_run=True)
+        self.assertEqual(added, 22)
+        self.assertEqual(SubjectResource.objects.count(), 1)
+        self.assertFalse([q for q in ctx.captured_queries if not q['sql'].startswith('SELECT')])
+        self.assertIn('Fluid Mechanics: +22 added, 2 skipped, 2 unmatched', out.getvalue())
+
+
+class DriveClientCacheTests(TestCase):
+
+    def setUp(self):
+        from unittest import mock
+        from google.oauth2.credentials import Credentials
+        drive_service.reset_drive_service()
+        self.addCleanup(drive_service.reset_drive_service)
+        patcher = mock.patch.object(drive_service, '_load_credentials', return_value=Credentials(token='token'))
+        self.load = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_client_is_built_once_per_process(self):
+        builds = drive_service.CLIENT_STATS['builds']
+        first = drive_service.get_drive_service()
+        self.assertIs(drive_service.get_drive_service(), first)
+        self.assertEqual(self.load.call_count, 1)
+        self.assertEqual(drive_service.CLIENT_STATS['builds'], builds + 1)
+
+    def test_each_request_gets_its_own_http(self):
+        service = drive_service.get_drive_service()
+        first = service.files().list(q='x')
+        second = service.files().list(q='x')
+        self.assertIsNot(first.http, second.http)
+
+    def test_benchmark_reports_missing_credentials(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        self.load.side_effect = FileNotFoundError('Credentials not found.')
+        with self.assertRaisesMessage(CommandError, 'Credentials not found.'):
+            call_command('benchmark_drive_client', '--iterations', '1')
@@ -19,6 +19,7 @@ urlpatterns = [
     path('ajax/delete-note/', views.delete_note_ajax, name='delete_note_ajax'),
     path('ajax/get-notes/', views.get_notes_ajax, name='get_notes_ajax'),
     path('ajax/notifications/read/', views.mark_notifications_read, name='mark_notifications_read'),
+    path('ajax/import-jobs/<int:job_id>/', views.import_job_status, name='import_job_status'),
     path('ajax/search-subjects/', views.search_subjects_ajax, name='search_subjects_ajax'),
     path('ajax/toggle-registration/', views.toggle_registration_ajax, name='toggle_registration_ajax'),
     path('levels/', views.LevelsView.as_view(), name='levels'),
@@ -51,6 +52,9 @@ urlpatterns = [
     path('chat/get/', views.get_messages, name='chat_get'),
     path('chat/sessions/', views.get_active_sessions, name='chat_sessions'),
     path('chat/end/', views.end_chat, name='chat_end'),
+    path('chat/broadcast/', views.broadcast_message, name='chat_broadcast'),
+    path('chat/throttle-stats/', views.chat_throttle_stats, name='chat_throttle_stats'),
+    path('chat/search/', views.search_chat, name='chat_search'),
     path('chat/read/', views.mark_chat_read, name='chat_mark_read'),
     path('dashboard/admin/chat/', views.admin_chat_dashboard, name='admin_chat'),
 
@@ -4,6 +4,7 @@ from django.contrib.auth import login, authenticate, logout, update_session_auth
 from django.contrib.auth.views import LoginView, LogoutView, PasswordChangeView
 from django.core.exceptions import ValidationError
 import json, re, os, time
+from .page_cache import render_static_page, page_version
 
 
 class AboutView(TemplateView):
@@ -11,10 +12,10 @@ class AboutView(TemplateView):
 
 
 def basic_software(request):
-    return render(request, 'hub/basic_software.html')
+    return render_static_page(request, 'hub/basic_software.html')
 
 def online_courses(request):
-    return render(request, 'hub/online_courses.html')
+    return render_static_page(request, 'hub/online_courses.html')
 
 from django.http import HttpResponse
 from django.conf import settings
@@ -31,37 +32,37 @@ def serve_sw(request):
 
 # New Resources Views
 def about_department(request):
-    return render(request, 'hub/about_department.html')
+    return render_static_page(request, 'hub/about_department.html')
 
 def academic_regulations(request):
-    return render(request, 'hub/academic_regulations.html')
+    return render_static_page(request, 'hub/academic_regulations.html')
 
 def credit_hour(request):
-    return render(request, 'hub/credit_hour.html')
+    return render_static_page(request, 'hub/credit_hour.html')
 
 def engineering_terminology(request):
-    return render(request, 'hub/engineering_terminology.html')
+    return render_static_page(request, 'hub/engineering_terminology.html')
 
 def study_plan(request):
-    return render(request, 'hub/study_plan.html')
+    return render_static_page(request, 'hub/study_plan.html')
 
 def registration(request):
-    return render(request, 'hub/registration.html')
+    return render_static_page(request, 'hub/registration.html')
 
 def time_management(request):
-    return render(request, 'hub/time_management.html')
+    return render_static_page(request, 'hub/time_management.html')
 
 def tools(request):
-    return render(request, 'hub/tools.html')
+    return render_static_page(request, 'hub/tools.html')
 
 def campus_guide(request):
-    return render(request, 'hub/campus_guide.html')
+    return render_static_page(request, 'hub/campus_guide.html')
 
 def academic_advice(request):
-    return render(request, 'hub/academic_advice.html')
+    return render_static_page(request, 'hub/academic_advice.html')
 
 def prerequisite_courses(request):
-    return render(request, 'hub/prerequisite_courses.html')
+    return render_static_page(request, 'hub/prerequisite_courses.html')
 
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
@@ -74,8 +75,9 @@ import os
 from django.db.models import Q
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from .models import Level, Subject, SubjectResource, StudentProfile, StudentNote, Notification, AIChatSession, AIChatMessage, UniversityKnowledge
+from .models import Level, Subject, SubjectResource, StudentProfile, StudentNote, AIChatSession, AIChatMessage, UniversityKnowledge
 from .forms import StudentSignUpForm, UserUpdateForm, StudentProfileForm
+from .notifications import enqueue_fan_out, broadcast_notification, mark_all_read
 from google import genai
 import json
 import re
@@ -111,14 +113,12 @@ class SignUpView(CreateView):
         
         messages.success(self.request, "Account created successfully! Please sign in.")
         
-        # Notify Admins about new signup
-        admin_users = User.objects.filter(is_staff=True)
-        for admin in admin_users:
-            Notification.objects.create(
-                user=admin,
-                title="New Student Registered",
-                message=f"Student {self.object.get_full_name() or self.object.username} (Level {level.level_id if level else 'N/A'}) has created an account."
-            )
+        # Notify Admins about new signup (sent by `manage.py run_workers`)
+        enqueue_fan_out(
+            'staff',
+            title="New Student Registered",
+            message=f"Student {self.object.get_full_name() or self.object.username} (Level {level.level_id if level else 'N/A'}) has created an account."
+        )
         
         return response
 
@@ -165,23 +165,35 @@ class LevelsView(ListView):
     ordering = ['level_id']
 
     def get_queryset(self):
-        from django.db.models import Count, Q
+        from django.db.models import Count, F, Sum, Value
+        from django.db.models.functions import Coalesce
+        stats = 'subjects__resource_stats__'
+        # Counts come from SubjectResourceStats (one row per subject), so no resource rows are joined
         return Level.objects.annotate(
-            course_count=Count('subjects', distinct=True),
+            course_count=Count('subjects'),
             # Library includes Lectures and Explanations
-            lecture_count=Count('subjects__pdf_resources', filter=Q(subjects__pdf_resources__category__in=['Lectures', 'Explanation']), distinct=True),
+            lecture_count=Coalesce(Sum(F(stats + 'lectures_count') + F(stats + 'explanation_count')), Value(0)),
             # Assignments includes Sheets, Exams, and Revisions
-            assignment_count=Count('subjects__pdf_resources', filter=Q(subjects__pdf_resources__category__in=['Sheets', 'Midterm', 'Final', 'Revision']), distinct=True)
+            assignment_count=Coalesce(Sum(
+                F(stats + 'sheets_count') + F(stats + 'midterm_count') + F(stats + 'final_count') + F(stats + 'revision_count')
+            ), Value(0))
         ).order_by('level_id')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        from django.db.models import Count
+        from django.db.models import F, Window
+        from django.db.models.functions import RowNumber
+        from .resource_stats import with_resource_counts
+
+        # First 3 subjects of every level (with their total file count) in one windowed query
+        previews = with_resource_counts(Subject.objects.all()).annotate(
+            position=Window(RowNumber(), partition_by=F('level_id'), order_by=[F('name').asc(), F('id').asc()])
+        ).filter(position__lte=3).order_by('level_id', 'position')
+        by_level = {}
+        for subject in previews:
+            by_level.setdefault(subject.level_id, []).append(subject)
         for level in context['levels']:
-            # Get first 3 subjects with their total file count (all categories)
-            level.preview_subjects = level.subjects.annotate(
-                file_count=Count('pdf_resources')
-            ).order_by('name')[:3]
+            level.preview_subjects = by_level.get(level.id, [])
         return context
 
 class LevelDetailView(DetailView):
@@ -192,70 +204,49 @@ class LevelDetailView(DetailView):
     slug_url_kwarg = 'level_id'
 
     def get_context_data(self, **kwargs):
-        from django.db.models import Count, Q
+        from django.utils.functional import SimpleLazyObject
+        from .resource_stats import get_level_subjects
         
         context = super().get_context_data(**kwargs)
-        level = self.get_object()
-        context['subjects_s1'] = Subject.objects.filter(level=level, semester=1).prefetch_related('pdf_resources').annotate(
-            explanation_count=Count('pdf_resources', filter=Q(pdf_resources__category='Explanation')),
-            lectures_count=Count('pdf_resources', filter=Q(pdf_resources__category='Lectures')),
-            sheets_count=Count('pdf_resources', filter=Q(pdf_resources__category='Sheets')),
-            midterm_count=Count('pdf_resources', filter=Q(pdf_resources__category='Midterm')),
-            final_count=Count('pdf_resources', filter=Q(pdf_resources__category='Final')),
-            revision_count=Count('pdf_resources', filter=Q(pdf_resources__category='Revision')),
-            workshop_count=Count('pdf_resources', filter=Q(pdf_resources__category='Workshops'))
-        )
-        context['subjects_s2'] = Subject.objects.filter(level=level, semester=2).prefetch_related('pdf_resources').annotate(
-            explanation_count=Count('pdf_resources', filter=Q(pdf_resources__category='Explanation')),
-            lectures_count=Count('pdf_resources', filter=Q(pdf_resources__category='Lectures')),
-            sheets_count=Count('pdf_resources', filter=Q(pdf_resources__category='Sheets')),
-            midterm_count=Count('pdf_resources', filter=Q(pdf_resources__category='Midterm')),
-            final_count=Count('pdf_resources', filter=Q(pdf_resources__category='Final')),
-            revision_count=Count('pdf_resources', filter=Q(pdf_resources__category='Revision')),
-            workshop_count=Count('pdf_resources', filter=Q(pdf_resources__category='Workshops'))
-        )
+        # One (cached) query for the whole level, split by semester here. Lazy, so a cached
+        # subjects fragment (level_page_version) doesn't load them at all.
+        subjects = SimpleLazyObject(lambda: get_level_subjects(self.object))
+        context['subjects_s1'] = SimpleLazyObject(lambda: [s for s in subjects if s.semester == 1])
+        context['subjects_s2'] = SimpleLazyObject(lambda: [s for s in subjects if s.semester == 2])
+        context['level_page_version'] = page_version('level', self.object.pk)
         context['categories'] = [t[0] for t in SubjectResource.RESOURCE_TYPES]
         return context
 
 @login_required
 def student_dashboard(request):
-    from django.db.models import Count, Q
+    from .resource_stats import with_resource_counts
     
     if request.user.is_staff:
         return redirect('hub:admin_dashboard')
     
-    profile = get_object_or_404(StudentProfile, user=request.user)
+    profile = get_object_or_404(StudentProfile.objects.select_related('level'), user=request.user)
+    request.user.profile = profile  # base.html reads user.profile; don't load it a second time
     
-    # Defaults
-    subjects_s1 = []
-    subjects_s2 = []
-    subjects_all = profile.registered_subjects.prefetch_related('pdf_resources').annotate(
-        explanation_count=Count('pdf_resources', filter=Q(pdf_resources__category='Explanation'), distinct=True),
-        lectures_count=Count('pdf_resources', filter=Q(pdf_resources__category='Lectures'), distinct=True),
-        sheets_count=Count('pdf_resources', filter=Q(pdf_resources__category='Sheets'), distinct=True),
-        midterm_count=Count('pdf_resources', filter=Q(pdf_resources__category='Midterm'), distinct=True),
-        final_count=Count('pdf_resources', filter=Q(pdf_resources__category='Final'), distinct=True),
-        revision_count=Count('pdf_resources', filter=Q(pdf_resources__category='Revision'), distinct=True),
-        workshop_count=Count('pdf_resources', filter=Q(pdf_resources__category='Workshops'), distinct=True)
-    ).order_by('name')
-
-    subjects_s1 = subjects_all.filter(semester=1)
-    subjects_s2 = subjects_all.filter(semester=2)
-
-    if profile.level:
-        current_level_id = profile.level.level_id
+    # One annotated query for all registered subjects, split by semester here
+    subjects_all = list(with_resource_counts(profile.registered_subjects.all()).order_by('name'))
+    subjects_s1 = [s for s in subjects_all if s.semester == 1]
+    subjects_s2 = [s for s in subjects_all if s.semester == 2]
+
+    current_level_id = profile.level.level_id if profile.level else None
 
     # Mock progress & Stats
-    current_gpa = profile.gpa
     total_credits = 18
     progress_percentage = 75
     
-    # Recent Uploads (Real Data)
+    # Recent Uploads (Real Data), reusing the subject ids and objects loaded above
     recent_uploads = []
-    if profile.level:
-         recent_uploads = SubjectResource.objects.filter(
-             subject__in=profile.registered_subjects.all()
-         ).select_related('subject').order_by('-upload_date')[:3]
+    if profile.level and subjects_all:
+        subjects_by_id = {s.id: s for s in subjects_all}
+        recent_uploads = list(
+            SubjectResource.objects.filter(subject_id__in=subjects_by_id).order_by('-upload_date')[:3]
+        )
+        for resource in recent_uploads:
+            resource.subject = subjects_by_id[resource.subject_id]
 
     # Mock "Last Accessed" resource (In real app, query RecentActivity model)
     last_resource = {
@@ -327,106 +318,38 @@ def admin_dashboard(request):
 
     if request.method == 'POST':
         # Branch based on which form was submitted
-        if 'drive_import' in request.POST:
+        if 'drive_cache_refresh' in request.POST:
+             from .drive_cache import expire_cache
+             expired = expire_cache()
+             messages.success(request, f"Drive cache refreshed: {expired} folder listings will be re-read.")
+             return redirect('hub:admin_dashboard')
+
+        elif 'drive_import' in request.POST:
              folder_url = request.POST.get('folder_url')
              subject_id = request.POST.get('subject_id')
              category = request.POST.get('category')
-             
-             if folder_url and subject_id and category:
-                 try:
-                     from .drive_service import list_files_in_folder
-                     
-                     files = list_files_in_folder(folder_url)
-                     subject = Subject.objects.get(id=subject_id)
-                     
-                     # CLEAR EXISTING RESOURCES for this Subject & Category (as requested)
-                     deleted_count, _ = SubjectResource.objects.filter(subject=subject, category=category).delete()
-                     
-                     count = 0
-                     
-                     # Separate solutions from regular files
-                     regular_files = []
-                     solution_files = []
-                     
-                     for f in files:
-                         name_lower = f['name'].lower()
-                         if 'solution' in name_lower or 'answer' in name_lower or 'model' in name_lower or 'حل' in name_lower:
-                             solution_files.append(f)
-                         else:
-                             regular_files.append(f)
-
-                     # Map created resources by normalized title for linking
-                     created_resources = {} 
-
-                     # 1. Create Regular Resources
-                     for f in regular_files:
-                         preview = f"https://drive.google.com/file/d/{f['id']}/preview"
-                         download = f"https://drive.google.com/uc?id={f['id']}&export=download"
-                         
-                         clean_title = f['name'].replace('.pdf', '').replace('.txt', '').strip()
-                         
-                         res = SubjectResource.objects.create(
-                             subject=subject,
-                             category=category,
-                             title=clean_title,
-                             preview_url=preview,
-                             download_url=download,
-                             drive_folder_url=folder_url,
-                             file_id=f['id']
-                         )
-                         created_resources[clean_title.lower()] = res
-                         count += 1
-                    
-                     # 2. Process Solutions and Link them
-                     for f in solution_files:
-                         preview = f"https://drive.google.com/file/d/{f['id']}/preview"
-                         download = f"https://drive.google.com/uc?id={f['id']}&export=download"
-                         
-                         # Attempt to find the parent sheet
-                         # logic: "Sheet 1 Solution" -> "Sheet 1"
-                         # Remove common solution keywords
-                         name_lower = f['name'].lower().replace('.pdf', '').replace('.txt', '')
-                         search_name = name_lower.replace('solution', '').replace('answer', '').replace('model', '').replace('answers', '').replace('حل', '').strip()
-                         
-                         # Fix double spaces or trailing punctuation often left by removal
-                         import re
-                         search_name = re.sub(r'\s+', ' ', search_name).strip(" -_")
-                         
-                         parent_res = created_resources.get(search_name)
-                         
-                         if parent_res:
-                             # Link to existing resource
-                             parent_res.solution_url = download # Using download link for solution button usually better, or preview?
-                             parent_res.solution_file_id = f['id']
-                             parent_res.save()
-                         else:
-                             # Fallback: Create as standalone resource if no parent found
-                             clean_title = f['name'].replace('.pdf', '').replace('.txt', '').strip()
-                             SubjectResource.objects.create(
-                                 subject=subject,
-                                 category=category,
-                                 title=clean_title,
-                                 preview_url=preview,
-                                 download_url=download,
-                                 drive_folder_url=folder_url,
-                                 file_id=f['id'],
-                                 solution_url=download if 'solution' in clean_title.lower() else None # Self-referencing if it IS a solution? No, just standard.
-                             )
-                             count += 1
-                             
-                     messages.success(request, f"Import Complete! Cleared {deleted_count} old files. Added/Linked {count} files from Drive.")
-                     
-                     # Notify Users similar to manual upload
-                     target_users = User.objects.filter(profile__level=subject.level)
-                     for u in target_users:
-                         Notification.objects.create(
-                             user=u,
-                             title="New Resources Imported",
-                             message=f"{count} new {category} files have been added for {subject.name}."
-                         )
-
-                 except Exception as e:
-                     messages.error(request, f"Drive Import Error: {str(e)}")
+             level_id = request.POST.get('level_id')
+
+             if request.POST.get('whole_level') and folder_url and level_id:
+                 # The folder is a level root (Term/Subject/Category); the worker crawls all of it
+                 from .jobs import enqueue
+                 job = enqueue('drive_level_import', {
+                     'root_url': folder_url,
+                     'level_id': int(level_id),
+                     'force': bool(request.POST.get('force')),
+                 }, user=request.user)
+                 messages.success(request, f"Whole-level Drive import #{job.pk} queued. Progress is shown below.")
+             elif folder_url and subject_id and category:
+                 # Listing, re-creating and linking can outlast the gunicorn timeout on big folders,
+                 # so the import runs in `manage.py run_workers` and the dashboard polls the job
+                 from .jobs import enqueue
+                 job = enqueue('drive_folder_import', {
+                     'folder_url': folder_url,
+                     'subject_id': int(subject_id),
+                     'category': category,
+                     'force': bool(request.POST.get('force')),
+                 }, user=request.user)
+                 messages.success(request, f"Drive import #{job.pk} queued. Progress is shown below.")
              else:
                  messages.error(request, "Missing fields for Drive Import.")
              
@@ -437,15 +360,13 @@ def admin_dashboard(request):
             if upload_form.is_valid():
                 resource = upload_form.save()
                 
-                # Notify Users
+                # Notify Users (one broadcast row for the whole level)
                 target_level = upload_form.cleaned_data['level']
-                target_users = User.objects.filter(profile__level=target_level)
-                for u in target_users:
-                    Notification.objects.create(
-                        user=u,
-                        title="New Resource Uploaded",
-                        message=f"A new {upload_form.cleaned_data['category']} link has been added for {upload_form.cleaned_data['subject']}. Check it out!"
-                    )
+                broadcast_notification(
+                    title="New Resource Uploaded",
+                    message=f"A new {upload_form.cleaned_data['category']} link has been added for {upload_form.cleaned_data['subject']}. Check it out!",
+                    level=target_level
+                )
                 
                 messages.success(request, 'Resource uploaded successfully!')
                 return redirect('hub:admin_dashboard')
@@ -491,7 +412,15 @@ def admin_dashboard(request):
     levels = Level.objects.all().order_by('level_id')
     subjects = Subject.objects.all().order_by('name')
 
+    # Recent background imports; unfinished ones are polled by the template
+    from .models import ImportJob
+    import_jobs = ImportJob.objects.filter(kind__startswith='drive_').order_by('-id')[:5]
+    from .drive_cache import cache_stats
+    drive_cache = cache_stats()
+
     context = {
+        'import_jobs': import_jobs,
+        'drive_cache': drive_cache,
         'total_students': total_students,
         'total_resources': total_resources,
         'recent_users': recent_users,
@@ -632,6 +561,9 @@ def resource_view(request, subject_id, category):
         'subject_name': subject.name,
         'category': category,
         'resources': resources,
+        'subject_page_version': page_version('subject', subject.pk),
+        # Staff see per-user delete forms (CSRF tokens), so their list is rendered fresh every time
+        'page_cache_timeout': 0 if request.user.is_staff else None,
     }
     return render(request, 'hub/resource_detail.html', context)
 
@@ -910,10 +842,23 @@ def delete_ai_session(request, session_id):
     session.delete()
     return JsonResponse({'success': True})
 
+@login_required
+def import_job_status(request, job_id):
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
+
+    from .jobs import job_status
+    from .models import ImportJob
+    try:
+        job = ImportJob.objects.get(pk=job_id)
+    except ImportJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Unknown job'}, status=404)
+    return JsonResponse({'success': True, **job_status(job)})
+
 @login_required
 @require_POST
 def mark_notifications_read(request):
-    request.user.notifications.filter(is_read=False).update(is_read=True)
+    mark_all_read(request.user)
     return JsonResponse({'success': True})
 
 
@@ -922,6 +867,7 @@ def mark_notifications_read(request):
 # CONTACT & LIVE CHAT SYSTEM
 # ==========================================
 from .models import ChatSession, ChatMessage
+from .middleware import invalidate_chat_polls
 import json
 from django.utils.timezone import now
 
@@ -960,6 +906,7 @@ def start_chat(request):
             is_active=True
         )
     
+    invalidate_chat_polls()
     return JsonResponse({'success': True, 'session_token': str(session.session_token)})
 
 # API: Send Message
@@ -979,11 +926,14 @@ def send_message(request):
         sender_type = request.POST.get('sender', 'student')
         file_url = request.POST.get('file_url') # Changed from file upload
 
+    if not session_id:
+        return JsonResponse({'success': False, 'error': 'Missing session ID'}, status=400)
+
     # Security check: ensure user owns session if authenticated
     try:
-        session = ChatSession.objects.filter(session_token=session_id).first()
-        if not session:
-            return JsonResponse({'success': False, 'error': 'Session not found'}, status=404)
+        session = ChatSession.objects.get(session_token=session_id)
+    except ChatSession.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Session not found'}, status=404)
     except ValidationError:
         return JsonResponse({'success': False, 'error': 'Invalid session ID format'}, status=400)
     
@@ -1004,6 +954,7 @@ def send_message(request):
     if not session.is_active:
         session.is_active = True  # Reactivate session if it was archived
     session.save()
+    invalidate_chat_polls(session.session_token)
 
     return JsonResponse({'success': True})
 
@@ -1011,11 +962,13 @@ def send_message(request):
 def get_messages(request):
     session_id = request.GET.get('session_id')
     last_id = request.GET.get('last_id', 0)
+    if not session_id:
+        return JsonResponse({'success': False, 'error': 'Missing session ID'}, status=400)
     
     try:
-        session = ChatSession.objects.filter(session_token=session_id).first()
-        if not session:
-            return JsonResponse({'success': False, 'error': 'Session not found'}, status=404)
+        session = ChatSession.objects.get(session_token=session_id)
+    except ChatSession.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Session not found'}, status=404)
     except ValidationError:
         return JsonResponse({'success': False, 'error': 'Invalid session ID format'}, status=400)
     
@@ -1023,13 +976,10 @@ def get_messages(request):
     if request.user.is_authenticated and not request.user.is_staff and session.user and session.user != request.user:
         return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
 
-    messages = ChatMessage.objects.filter(session=session, id__gt=last_id).order_by('created_at')
+    # Ids grow with created_at, so ordering by id lets the (session, id) index serve the whole query
+    messages = ChatMessage.objects.filter(session=session, id__gt=last_id).order_by('id')
     
     data = [{
-        'id': m.id,
-        'sender': m.sender,
-        'message': m.message,
-        'created_at': m.created_at.strftime('%H:%M'),
         'id': m.id,
         'sender': m.sender,
         'message': m.message,
@@ -1039,16 +989,136 @@ def get_messages(request):
         'has_file': bool(m.file_url)
     } for m in messages]
 
+    # Initial load: prepend history moved to cold storage by `manage.py archive_chats`.
+    # Archived ids are always lower than live ones, so last_id polling keeps working.
+    if str(last_id) == '0':
+        from .chat_archive import load_archived_messages
+        archived = [{
+            'id': m['id'],
+            'sender': m['sender'],
+            'message': m['message'],
+            'created_at': m['created_at'].strftime('%H:%M'),
+            'file_url': m['file_url'] if m['file_url'] else None,
+            'file_name': 'Attachment' if m['file_url'] else None,
+            'has_file': bool(m['file_url'])
+        } for m in load_archived_messages(session)]
+        data = archived + data
+
     return JsonResponse({'success': True, 'messages': data})
 
+# API: Broadcast (Admin announcement to many sessions at once)
+@require_POST
+@login_required
+def broadcast_message(request):
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
+
+    data = json.loads(request.body)
+    message_text = (data.get('message') or '').strip()
+    session_ids = data.get('session_ids')  # Optional list of session tokens; defaults to every active session
+
+    if not message_text:
+        return JsonResponse({'success': False, 'error': 'Empty message'})
+
+    sessions = ChatSession.objects.filter(is_active=True)
+    if session_ids:
+        try:
+            sessions = sessions.filter(session_token__in=session_ids)
+        except ValidationError:
+            return JsonResponse({'success': False, 'error': 'Invalid session ID format'}, status=400)
+
+    targets = dict(sessions.values_list('id', 'session_token'))
+    target_ids = list(targets)
+    if not target_ids:
+        return JsonResponse({'success': True, 'sent': 0})
+
+    from django.db import transaction
+    with transaction.atomic():
+        # One INSERT per batch and one UPDATE overall, instead of lookup + insert + save per session
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session_id=session_id, sender='support', message=message_text, is_read=False)
+            for session_id in target_ids
+        ], batch_size=500)
+        ChatSession.objects.filter(id__in=target_ids).update(updated_at=now())
+
+    # Wake the sidebar and every targeted conversation's message poll
+    invalidate_chat_polls(*targets.values())
+
+    return JsonResponse({'success': True, 'sent': len(target_ids)})
+
+# API: Search Chat History (Admin)
+@login_required
+def search_chat(request):
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
+
+    from .chat_search import search_chat_history
+    result = search_chat_history(request.GET.get('q', ''), page=request.GET.get('page', 1))
+    page = result['page']
+
+    def session_name(s):
+        return s.user.get_full_name() or s.user.username if s.user else (s.guest_name or "Visitor")
+
+    sessions_data = [{
+        'id': str(s.session_token),
+        'name': session_name(s),
+        'email': s.user.email if s.user else (s.guest_email or "No email"),
+        'is_active': s.is_active,
+        'updated_at': s.updated_at.strftime('%Y-%m-%d %H:%M'),
+    } for s in result['sessions']]
+
+    messages_data = [{
+        'id': m.id,
+        'session_id': str(m.session.session_token),
+        'name': session_name(m.session),
+        'sender': m.sender,
+        'message': m.message,
+        'created_at': m.created_at.strftime('%Y-%m-%d %H:%M'),
+    } for m in page.object_list]
+
+    return JsonResponse({
+        'success': True,
+        'sessions': sessions_data,
+        'messages': messages_data,
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'total': page.paginator.count,
+    })
+
+# Ended conversations only grow; the archived sidebar shows the latest ones (older ones are found by search)
+ARCHIVED_SIDEBAR_LIMIT = 50
+
+def sidebar_sessions(show_archived):
+    """
+    Sessions for the admin chat sidebar with their user and unread count loaded in the same query
+    (the count is a correlated subquery, evaluated only for the rows returned).
+    """
+    from django.db.models import Count, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+    unread = (
+        ChatMessage.objects.filter(session=OuterRef('pk'), sender='student', is_read=False)
+        .order_by().values('session').annotate(n=Count('id')).values('n')
+    )
+    sessions = (
+        ChatSession.objects.filter(is_active=not show_archived)
+        .select_related('user')
+        .annotate(unread_count=Coalesce(Subquery(unread), 0))
+        .order_by('-updated_at')
+    )
+    return sessions[:ARCHIVED_SIDEBAR_LIMIT] if show_archived else sessions
+
 # Admin Chat Dashboard
 @login_required
 def admin_chat_dashboard(request):
     if not request.user.is_staff:
         return redirect('hub:home')
     
-    sessions = ChatSession.objects.filter(is_active=True).order_by('-updated_at')
-    return render(request, 'hub/admin_chat.html', {'sessions': sessions})
+    # ?view=archived lists ended conversations so their (possibly archived) history can be reopened
+    show_archived = request.GET.get('view') == 'archived'
+    return render(request, 'hub/admin_chat.html', {
+        'sessions': sidebar_sessions(show_archived),
+        'show_archived': show_archived,
+    })
 
 # API: Get Active Sessions (for Admin Sidebar Polling)
 @login_required
@@ -1056,10 +1126,10 @@ def get_active_sessions(request):
     if not request.user.is_staff:
         return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
         
-    sessions = ChatSession.objects.filter(is_active=True).order_by('-updated_at')
+    show_archived = request.GET.get('view') == 'archived'
     
     data = []
-    for s in sessions:
+    for s in sidebar_sessions(show_archived):
         name = s.user.get_full_name() or s.user.username if s.user else (s.guest_name or "Visitor")
         status = "LOGGED IN" if s.user else "GUEST"
         email = s.user.email if s.user else (s.guest_email or "No email")
@@ -1070,7 +1140,7 @@ def get_active_sessions(request):
             'status': status,
             'email': email,
             'updated_at': s.updated_at.strftime('%H:%M'), # Simplified time
-            'unread': s.unread_for_admin,
+            'unread': s.unread_count,
             'timesince': s.updated_at.isoformat() # We can format this on frontend if needed or just use current time diff
         })
         
@@ -1084,6 +1154,8 @@ def end_chat(request):
         
     data = json.loads(request.body)
     session_id = data.get('session_id')
+    if not session_id:
+        return JsonResponse({'success': False, 'error': 'Missing session ID'}, status=400)
     try:
         session = ChatSession.objects.get(session_token=session_id)
     except (ChatSession.DoesNotExist, ValidationError):
@@ -1094,6 +1166,7 @@ def end_chat(request):
     
     session.is_active = False
     session.save()
+    invalidate_chat_polls(session.session_token)
         
     return JsonResponse({'success': True})
 
@@ -1106,6 +1179,8 @@ def mark_chat_read(request):
         
     data = json.loads(request.body)
     session_id = data.get('session_id')
+    if not session_id:
+        return JsonResponse({'success': False, 'error': 'Missing session ID'}, status=400)
     try:
         session = ChatSession.objects.get(session_token=session_id)
     except (ChatSession.DoesNotExist, ValidationError):
@@ -1113,5 +1188,16 @@ def mark_chat_read(request):
     
     # Mark messages as read
     session.messages.filter(sender='student', is_read=False).update(is_read=True)
+    invalidate_chat_polls(session.session_token)
     
     return JsonResponse({'success': True})
+
+# API: Poll Throttle Stats (monitoring)
+@login_required
+def chat_throttle_stats(request):
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
+
+    from .middleware import get_backend, get_throttle_settings
+    conf = get_throttle_settings()
+    return JsonResponse({'success': True, 'backend': conf['BACKEND'], 'stats': get_backend(conf['BACKEND']).stats()})
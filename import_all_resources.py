@@ -1,11 +1,17 @@
+import argparse
 import os
 import django
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mechatronics_hub.settings')
 django.setup()
 
+from django.db import transaction
+
 from hub.models import Subject, SubjectResource
+from hub.resource_stats import defer_stats_refresh
 
 # Map sections to DB choices
 CATEGORY_MAP = {
@@ -17,6 +23,9 @@ CATEGORY_MAP = {
     'EXPLANATION': 'Explanation'
 }
 
+# Rows per INSERT
+BATCH_SIZE = 500
+
 def get_drive_id(url):
     """Extracts File ID from Google Drive URL."""
     if not url: return None
@@ -26,120 +35,170 @@ def get_drive_id(url):
     if match: return match.group(1)
     return None
 
-def import_resources():
-    # Updated to look in the new massive folder
-    base_dir = "resource_import_files"
-    if not os.path.exists(base_dir):
-        # Fallback to old one if user puts them there, but better to stick to one
-        if os.path.exists("resource_import_000"):
-            base_dir = "resource_import_000"
+def parse_line(line, category):
+    """
+    Parses one "Name | URL", "Name - URL" or bare URL line of a section.
+    Returns (title, preview_url, download_url) or None if the line has no link.
+    """
+    title = ""
+    url = ""
+
+    if " | " in line:
+        parts = line.split(" | ", 1)
+        title = parts[0].strip()
+        url = parts[1].strip()
+    elif " - " in line:
+        parts = line.split(" - ", 1)
+        title = parts[0].strip()
+        url = parts[1].strip()
+    else:
+        if "http" in line:
+            url = line
+            title = f"{category} Resource"
         else:
-            print(f"Directory {base_dir} not found.")
-            return
+            return None
+
+    drive_id = get_drive_id(url)
+    if drive_id:
+        preview_url = f"https://drive.google.com/file/d/{drive_id}/preview"
+        download_url = f"https://drive.google.com/uc?id={drive_id}&export=download"
+        # Use Name from line if available, else generic
+        # If user pasted just URL, title is "Lecture Resource".
+        # If they pasted "Lecture 1 | URL", title is "Lecture 1".
+    else:
+        preview_url = url
+        download_url = url
+
+    return title or category, preview_url, download_url
+
+def parse_file(path):
+    """
+    Parses one import file in a single streaming pass, without touching the database, so it can run
+    in a worker process. Returns (rows, unmatched): rows are (category, title, preview_url, download_url)
+    and unmatched counts lines that are neither headers nor links in a known section.
+    """
+    rows = []
+    unmatched = 0
+    current_category = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            if line.startswith("[") and line.endswith("]"):
+                section = line[1:-1]
+                current_category = CATEGORY_MAP.get(section)
+                continue
+
+            row = parse_line(line, current_category) if current_category else None
+            if row:
+                rows.append((current_category, *row))
+            else:
+                unmatched += 1
+    return rows, unmatched
 
-    files = [f for f in os.listdir(base_dir) if f.endswith(".txt")]
+def parse_files(paths, workers=None):
+    """Parses files across a process pool (`workers` processes, default one per core; 1 parses in-process)."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        return [parse_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return list(pool.map(parse_file, paths, chunksize=4))
+
+def import_resources(base_dir=None, batch_size=BATCH_SIZE, workers=None, dry_run=False):
+    """
+    Parses every file of `base_dir` in parallel, merges the records and writes the new ones in one
+    transaction. With `dry_run` only the per-subject add/skip/unmatched report is printed.
+    Returns the number of resources added (or that would be added).
+    """
+    if base_dir is None:
+        # Updated to look in the new massive folder
+        base_dir = "resource_import_files"
+        if not os.path.exists(base_dir):
+            # Fallback to old one if user puts them there, but better to stick to one
+            if os.path.exists("resource_import_000"):
+                base_dir = "resource_import_000"
+            else:
+                print(f"Directory {base_dir} not found.")
+                return
+    start = time.perf_counter()
+
+    files = sorted(f for f in os.listdir(base_dir) if f.endswith(".txt"))
     print(f"Found {len(files)} files in {base_dir}")
 
+    # Subject names (case-insensitive, first by id like .filter().first()) in one query
+    subjects = {}
+    for subject in Subject.objects.order_by('id'):
+        subjects.setdefault(subject.name.lower(), subject)
+
+    # Every (subject, category, download_url) already stored, so duplicates are a set lookup
+    existing = set(SubjectResource.objects.values_list('subject_id', 'category', 'download_url'))
+
+    # Files whose subject isn't in the database are reported, not parsed
+    targets = []
     for filename in files:
         # Revert filename to subject name: Engineering_History.txt -> Engineering History
-        # But we need to match it robustly.
         # The generate script replaced spaces with underscores.
         subject_name_search = filename.replace(".txt", "").replace("_", " ")
-        
-        # Try exact match first
-        subject = Subject.objects.filter(name__iexact=subject_name_search).first()
-        
-        # If not found, try replacing underscores with spaces in DB name?
-        # or simplified matching.
+        subject = subjects.get(subject_name_search.lower())
         if not subject:
-            # Try to find by partial? No, dangerous.
             print(f"Skipping {filename}: Subject '{subject_name_search}' not found.")
             continue
+        targets.append((filename, subject))
 
-        # Check if file has any content besides headers
-        has_content = False
-        with open(os.path.join(base_dir, filename), 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip() and not line.startswith("#") and not line.startswith("["):
-                    has_content = True
-                    break
-        
-        if not has_content:
-            continue
+    # 1. Parse (no database access)
+    parse_start = time.perf_counter()
+    parsed = parse_files([os.path.join(base_dir, filename) for filename, _ in targets], workers)
+    parse_seconds = time.perf_counter() - parse_start
+
+    # 2. Merge: one report line per subject, new rows de-duplicated across files
+    new = []
+    report = {}
+    lines = 0
+    for (filename, subject), (rows, unmatched) in zip(targets, parsed):
+        counts = report.setdefault(subject.name, {'added': 0, 'skipped': 0, 'unmatched': 0})
+        counts['unmatched'] += unmatched
+        lines += len(rows) + unmatched
+        for category, title, preview_url, download_url in rows:
+            key = (subject.id, category, download_url)
+            if key in existing:
+                counts['skipped'] += 1
+                continue
+            existing.add(key)
+            counts['added'] += 1
+            new.append((subject, category, title, preview_url, download_url))
+
+    for name, counts in report.items():
+        print(f"  {name}: +{counts['added']} added, {counts['skipped']} skipped, {counts['unmatched']} unmatched")
+
+    # 3. Write everything in one transaction (all or nothing)
+    if new and not dry_run:
+        with transaction.atomic(), defer_stats_refresh() as touched:
+            # bulk_create sends no signals; the touched subjects are refreshed when the block ends
+            SubjectResource.objects.bulk_create([
+                SubjectResource(
+                    subject=subject,
+                    category=category,
+                    title=title,
+                    preview_url=preview_url,
+                    download_url=download_url
+                )
+                for subject, category, title, preview_url, download_url in new
+            ], batch_size=batch_size)
+            touched.update(row[0].id for row in new)
 
-        print(f"Processing {subject.name}...")
-        
-        current_category = None
-        count_added = 0
-        
-        with open(os.path.join(base_dir, filename), 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-
-                if line.startswith("[") and line.endswith("]"):
-                    section = line[1:-1]
-                    current_category = CATEGORY_MAP.get(section)
-                    continue
-
-                if current_category:
-                    # Parse Line
-                    title = ""
-                    url = ""
-                    
-                    if " | " in line:
-                        parts = line.split(" | ", 1)
-                        title = parts[0].strip()
-                        url = parts[1].strip()
-                    elif " - " in line:
-                        parts = line.split(" - ", 1)
-                        title = parts[0].strip()
-                        url = parts[1].strip()
-                    else:
-                        if "http" in line:
-                            url = line
-                            title = f"{current_category} Resource" 
-                        else:
-                            continue 
-
-                    drive_id = get_drive_id(url)
-                    if drive_id:
-                        preview_url = f"https://drive.google.com/file/d/{drive_id}/preview"
-                        download_url = f"https://drive.google.com/uc?id={drive_id}&export=download"
-                        
-                        # Use Name from line if available, else generic
-                        # If user pasted just URL, title is "Lecture Resource".
-                        # If they pasted "Lecture 1 | URL", title is "Lecture 1".
-                    else:
-                        preview_url = url
-                        download_url = url
-                    
-                    if not title:
-                        title = current_category
-
-                    # Check existence
-                    exists = SubjectResource.objects.filter(
-                        subject=subject,
-                        category=current_category,
-                        download_url=download_url
-                    ).exists()
-
-                    if not exists:
-                        SubjectResource.objects.create(
-                            subject=subject,
-                            category=current_category,
-                            title=title,
-                            preview_url=preview_url,
-                            download_url=download_url
-                        )
-                        print(f"  + Added '{title}'")
-                        count_added += 1
-                    else:
-                        pass # Silent skip
-                        
-        if count_added == 0:
-            print("  (No new resources found)")
+    elapsed = time.perf_counter() - start
+    rate = lines / elapsed if elapsed else 0
+    verb = "would be added" if dry_run else "added"
+    print(f"Done{' (dry run)' if dry_run else ''}: {len(new)} {verb} from {lines} rows in {elapsed:.2f}s "
+          f"(parse {parse_seconds:.2f}s, {rate:.0f} rows/sec)")
+    return len(new)
 
 if __name__ == "__main__":
-    import_resources()
+    parser = argparse.ArgumentParser(description="Import resource links from resource_import_files/*.txt")
+    parser.add_argument('--dir', help="Directory of import files (default: resource_import_files)")
+    parser.add_argument('--workers', type=int, help="Parser processes (default: one per core)")
+    parser.add_argument('--dry-run', action='store_true', help="Print the per-subject report without writing")
+    args = parser.parse_args()
+    import_resources(args.dir, workers=args.workers, dry_run=args.dry_run)
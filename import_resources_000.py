@@ -117,4 +117,6 @@ def import_resources():
                         print(f"  . Skipped duplicate '{title}'")
 
 if __name__ == "__main__":
-    import_resources()
+    from hub.resource_stats import defer_stats_refresh
+    with defer_stats_refresh():
+        import_resources()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
+import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hub.middleware.ChatPollThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -65,6 +67,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'hub.context_processors.notifications',
             ],
         },
     },
@@ -135,6 +138,64 @@ LOGIN_REDIRECT_URL = 'hub:home'
 LOGOUT_REDIRECT_URL = 'hub:home'
 LOGIN_URL = 'hub:login'
 
+# Support chat polling limits (see hub/middleware.py). The 'memory' backend keeps its buckets in each
+# process, so under gunicorn a client gets RATE/BURST once per worker; 'cache' keeps them in the
+# 'chat_polls' cache alias, which is only shared if that alias points at memcached/Redis.
+CHAT_POLL_THROTTLE = {
+    'BACKEND': os.environ.get('CHAT_POLL_THROTTLE_BACKEND', 'memory'),  # 'memory' or 'cache'
+    'RATE': 1.0,
+    'BURST': 5,
+    'COALESCE_SECONDS': 1.0,
+}
+
+# Read notifications older than this (roughly one term) are removed by `manage.py prune_notifications`
+NOTIFICATION_RETENTION_DAYS = 120
+
+# Rendered page fragments (hub/page_cache.py) go to 'template_fragments'. PAGE_CACHE_BACKEND picks
+# 'db' (default), 'file' or 'locmem'. Only 'db' and 'file' are shared between the web and worker
+# processes; with 'locmem' a job's invalidations never reach gunicorn. Tables are made by createcachetable.
+PAGE_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'page-fragments',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PAGE_CACHE_DIR', str(BASE_DIR / '.page_cache')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'hub_page_cache',
+    },
+}
+
+# 'default' holds the level-subject lists, notification summaries and broadcast version that the
+# worker (run_workers) invalidates, so it has to be shared with the web process too. Its table (and
+# hub_page_cache) is created by migration hub 0031, so `migrate` alone is enough.
+# 'chat_polls' is read and written on every support-chat poll (hub/middleware.py); it stays in process
+# memory so polling never costs database queries. A stale coalesced poll lasts at most COALESCE_SECONDS.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'hub_cache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'chat_polls': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chat-polls',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'template_fragments': {
+        **PAGE_CACHE_BACKENDS[os.environ.get('PAGE_CACHE_BACKEND', 'db')],
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+# Drive folder listings are kept in the database (hub/drive_cache.py) for this many seconds so
+# re-running an import doesn't go back to the Drive API; 0 turns the cache off.
+DRIVE_CACHE_TTL = int(os.environ.get('DRIVE_CACHE_TTL', 900))
+
 CSRF_TRUSTED_ORIGINS = [
     'https://*.railway.app',
     'https://mechatronics-data.up.railway.app' # الرابط الجديد هنا